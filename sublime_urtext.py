@@ -361,6 +361,8 @@ def initialize_project_list(window,
     global _UrtextProjectList
 
     if reload_projects: 
+        if _UrtextProjectList:
+            _UrtextProjectList.stop_watching_files()
         _UrtextProjectList = None
     if window:
         folder = get_current_folder(window)
@@ -371,9 +373,15 @@ def initialize_project_list(window,
             if not _UrtextProjectList.set_current_project(folder) and add_project:
                 return _UrtextProjectList.initialize_project(folder, new_file_node_created=new_file_node_created)
         elif folder and add_project:
-            _UrtextProjectList = ProjectList(folder, editor_methods=editor_methods)
+            _UrtextProjectList = ProjectList(folder, editor_methods=editor_methods, cache_location=get_cache_location(), watch_files=watch_files())
         return _UrtextProjectList
 
+def get_cache_location():
+    return os.path.join(sublime.cache_path(), 'Urtext')
+
+def watch_files():
+    return sublime.load_settings('sublime_urtext.sublime-settings').get('watch_files', False)
+
 def get_current_folder(window):
     view = window.active_view()
     folder = None
@@ -530,7 +538,7 @@ class UrtextStarterProjectCommand(sublime_plugin.TextCommand):
             ProjectList.make_starter_project(path)
             global _UrtextProjectList
             if not _UrtextProjectList:
-                _UrtextProjectList = ProjectList(path, editor_methods=editor_methods)
+                _UrtextProjectList = ProjectList(path, editor_methods=editor_methods, cache_location=get_cache_location(), watch_files=watch_files())
             else:
                 _UrtextProjectList.init_project(path, make_current=True, selector='urtext_home')
         sublime.select_folder_dialog(create_project)
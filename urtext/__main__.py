@@ -0,0 +1,289 @@
+"""
+Compiles Urtext projects without an editor:
+
+    python -m urtext compile <path> [--workers N] [--dry-run] [--json] [--profile]
+
+Frames are run and their output written to the files, as when the
+project is opened in an editor. Exits with 1 if any file has parse
+errors or no project is found at the path.
+
+The bundled libraries import this package as `Urtext`, so the folder
+containing it must be named Urtext and its parent be on PYTHONPATH.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+from urtext.project_list import ProjectList
+import urtext.utils as utils
+
+def file_editor_methods(log=sys.stderr, written=None):
+    """
+    editor methods for running without an editor: buffers are the
+    files on disk. Given a dict as written, nothing is written; the
+    contents each file would get are kept in it by filename instead,
+    and read back from it.
+    """
+
+    def write_file(filename, contents):
+        if written is None:
+            utils.write_file_contents(filename, contents)
+        else:
+            written[filename] = contents
+
+    def read_file(filename):
+        if written and filename in written:
+            return written[filename]
+        with open(filename, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def set_buffer(filename, contents, identifier=None):
+        if filename:
+            write_file(filename, contents)
+
+    def message(text, *args, **kwargs):
+        print(text, file=log)
+
+    def nothing(*args, **kwargs):
+        return None
+
+    methods = {
+        'set_buffer': set_buffer,
+        'get_buffer': read_file,
+        'popup': message,
+        'status_message': message,
+        'error_message': message,
+        'write_to_console': message,
+    }
+    if written is not None:
+        methods['write_file'] = write_file
+        methods['read_file'] = read_file
+    for name in [
+        'refresh_files',
+        'close_file',
+        'close_inactive',
+        'retarget_view',
+        'save_file',
+        ]:
+        methods[name] = nothing
+    return methods
+
+def compile_project(path,
+    workers=0,
+    cache_location=None,
+    base_project_path=None,
+    profile=False,
+    dry_run=False,
+    log=sys.stderr):
+    """
+    Loads and compiles the project at path synchronously and
+    returns a report with timings, changed files and parse errors.
+    With profile, each project's report has the time spent by phase,
+    file and frame (see urtext.timing). With dry_run nothing is
+    written, including the parse cache, and the files that would
+    change are reported instead.
+    """
+    if base_project_path is None:
+        base_project_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'base_project')
+    root = path if os.path.isdir(path) else os.path.dirname(path)
+    written = {} if dry_run else None
+    if dry_run:
+        cache_location = None
+    else:
+        before = _file_signatures(root)
+    phases = {}
+
+    start = time.time()
+    with contextlib.redirect_stdout(log):
+        project_list = ProjectList(
+            path,
+            is_async=False,
+            base_project_path=base_project_path,
+            cache_location=cache_location,
+            parse_workers=workers,
+            profile=profile,
+            editor_methods=file_editor_methods(log=log, written=written))
+    phases['load'] = time.time() - start
+
+    start = time.time()
+    with contextlib.redirect_stdout(log):
+        for project in project_list.projects:
+            if project.compiled and not _is_base_project(project, base_project_path):
+                # compiling leaves frame output in the buffers; the
+                # editor writes it when a file is next visited
+                for buffer in list(project.files.values()):
+                    buffer.write_buffer_contents()
+    phases['write'] = time.time() - start
+
+    start = time.time()
+    if dry_run:
+        changed = sorted(
+            _report_path(f, root) for f, contents in written.items()
+            if contents != _read_or_none(f))
+    else:
+        after = _file_signatures(root)
+        changed = sorted(f for f in set(before) | set(after) if before.get(f) != after.get(f))
+    phases['compare'] = time.time() - start
+
+    projects = []
+    errors = {}
+    for project in project_list.projects:
+        if _is_base_project(project, base_project_path):
+            continue
+        projects.append({
+            'title': project.title(),
+            'compiled': project.compiled,
+            'files': len(project.files),
+            'nodes': len(project.nodes),
+            'seconds': project.last_compile_time,
+        })
+        if profile:
+            report = project.profile_report()
+            report['files'] = {
+                os.path.relpath(f, root) if os.path.isabs(f) else f: entry
+                for f, entry in report['files'].items()}
+            projects[-1]['profile'] = report
+        for filename, messages in project.messages.items():
+            # parse errors are the messages placed in the file; the
+            # rest are log output
+            messages = [m['top_message'] for m in messages if 'position' in m]
+            if messages and os.path.isabs(filename):
+                errors[os.path.relpath(filename, root)] = messages
+    project_list.stop_watching_files()
+    return {
+        'path': os.path.abspath(path),
+        'phases': phases,
+        'projects': projects,
+        'changed': changed,
+        'errors': errors,
+    }
+
+def _is_base_project(project, base_project_path):
+    return os.path.abspath(project.entry_point) == os.path.abspath(base_project_path)
+
+def _report_path(filename, root):
+    """ relative to root if inside it """
+    filename = os.path.normpath(filename)
+    relative = os.path.relpath(filename, root)
+    return filename if relative.startswith(os.pardir) else relative
+
+def _read_or_none(filename):
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+def _file_signatures(root):
+    """
+    {relative path: (mtime, size)}; buffers are only written when their
+    contents change, though file targets rewrite their file regardless
+    """
+    signatures = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in ('.git', '_diff')]
+        for filename in filenames:
+            full_path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue
+            signatures[os.path.relpath(full_path, root)] = (stat.st_mtime_ns, stat.st_size)
+    return signatures
+
+def _compile(args):
+    path = os.path.abspath(args.path)
+    if not os.path.exists(path):
+        print('%s does not exist' % path, file=sys.stderr)
+        return 2
+    with contextlib.ExitStack() as stack:
+        log = stack.enter_context(open(os.devnull, 'w')) if args.quiet else sys.stderr
+        report = _run_compile(args, path, log)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    if not any(p['compiled'] for p in report['projects']):
+        print('No Urtext project found at %s' % path, file=sys.stderr)
+        return 1
+    return 1 if report['errors'] else 0
+
+def _run_compile(args, path, log):
+    report = compile_project(
+        path,
+        workers=args.workers,
+        cache_location=args.cache,
+        profile=args.profile,
+        dry_run=args.dry_run,
+        log=log)
+    report['dry_run'] = args.dry_run
+    return report
+
+def _print_report(report):
+    for project in report['projects']:
+        print('%s: %d files, %d nodes, %.3fs%s' % (
+            project['title'],
+            project['files'],
+            project['nodes'],
+            project['seconds'],
+            '' if project['compiled'] else ' (not compiled)'))
+        if 'profile' in project:
+            _print_profile(project['profile'])
+    for phase, seconds in report['phases'].items():
+        print('%-12s %8.3fs' % (phase, seconds))
+    verb = 'would change' if report['dry_run'] else 'changed'
+    for filename in report['changed']:
+        print('%s %s' % (verb, filename))
+    if not report['changed']:
+        print('no files %s' % verb)
+    for filename, messages in report['errors'].items():
+        for message in messages:
+            print('%s: %s' % (filename, message), file=sys.stderr)
+
+def _print_profile(profile, top=10):
+    for phase, entry in profile['phases'].items():
+        print('  %-26s %6d %9.3fs %9.3fs own' % (
+            phase, entry['count'], entry['seconds'], entry['self_seconds']))
+    for name, entry in list(profile['files'].items())[:top]:
+        print('  file   %9.3fs %s' % (entry['seconds'], name))
+    for frame in profile['frame_runs'][:top]:
+        print('  frame  %9.3fs %s: %d runs, %d nodes, %d characters; %s' % (
+            frame['seconds'],
+            frame['node_id'],
+            frame['count'],
+            frame['nodes'],
+            frame['characters'],
+            ', '.join('%s %.3fs' % o for o in frame['operations'].items())))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m urtext')
+    commands = parser.add_subparsers(dest='command', required=True)
+    compile_parser = commands.add_parser(
+        'compile',
+        help='parse a project, run its frames and write their output')
+    compile_parser.add_argument('path', help='project folder or file')
+    compile_parser.add_argument('--workers', type=int, default=0,
+        help='processes for parsing files in parallel (default: parse serially)')
+    compile_parser.add_argument('--cache', default=None,
+        help='folder for the parse cache')
+    compile_parser.add_argument('--dry-run', action='store_true',
+        help=' '.join([
+            'compile without writing anything, including the parse cache,',
+            'and list the files that would change']))
+    compile_parser.add_argument('--json', action='store_true',
+        help='print the report as JSON')
+    compile_parser.add_argument('--quiet', action='store_true',
+        help='do not print project messages')
+    compile_parser.add_argument('--profile', action='store_true',
+        help='report the time spent by phase, file and frame')
+    args = parser.parse_args(argv)
+    if args.command == 'compile':
+        return _compile(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
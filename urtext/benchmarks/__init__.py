@@ -0,0 +1 @@
+# benchmarks on generated projects; run with python -m urtext.benchmarks
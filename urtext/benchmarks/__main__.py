@@ -0,0 +1,79 @@
+"""
+Times Urtext on generated projects and prints the results as JSON:
+
+    python -m urtext.benchmarks [--files N] [--repeat N] [--output FILE]
+    python -m urtext.benchmarks --scale 250,500,1000,2000
+    python -m urtext.benchmarks --memory
+
+With --scale, the suite runs once per number of files and exits
+with 1 if any benchmark grows faster than --threshold (the exponent
+of time against number of nodes). With --memory, it measures the
+memory the loaded project takes instead of timing it.
+"""
+
+import argparse
+import json
+import sys
+
+from urtext.benchmarks.corpus import DEFAULTS
+from urtext.benchmarks.suite import BENCHMARKS, run_suite, run_scaling, environment
+from urtext.benchmarks.memory import measure_memory
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m urtext.benchmarks')
+    for key, default in DEFAULTS.items():
+        if isinstance(default, bool):
+            parser.add_argument('--no-' + key.replace('_', '-'),
+                dest=key, action='store_false', default=default)
+        else:
+            parser.add_argument('--' + key.replace('_', '-'),
+                type=type(default), default=default)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', default=None,
+        help='comma-separated benchmarks, from: ' + ', '.join(BENCHMARKS))
+    parser.add_argument('--scale', default=None,
+        help='comma-separated numbers of files to run the suite at')
+    parser.add_argument('--threshold', type=float, default=1.25,
+        help='growth exponent above which --scale flags a benchmark')
+    parser.add_argument('--memory', action='store_true',
+        help='report bytes per node and per instance of each node, metadata and link class')
+    parser.add_argument('--workspace', default=None,
+        help='folder to generate projects in (default: a temporary folder)')
+    parser.add_argument('--output', default=None,
+        help='file to write the JSON to (default: stdout)')
+    args = parser.parse_args(argv)
+
+    params = {key: getattr(args, key) for key in DEFAULTS}
+    only = args.only.split(',') if args.only else None
+    report = environment()
+    if args.memory:
+        report['memory'] = measure_memory(workspace=args.workspace, **params)
+    elif args.scale:
+        del params['files']
+        report.update(run_scaling(
+            [int(s) for s in args.scale.split(',')],
+            threshold=args.threshold,
+            workspace=args.workspace,
+            repeat=args.repeat,
+            only=only,
+            **params))
+    else:
+        report.update(run_suite(
+            workspace=args.workspace,
+            repeat=args.repeat,
+            only=only,
+            **params))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if report.get('superlinear'):
+        print('Super-linear: %s' % ', '.join(report['superlinear']), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,621 @@
+"""
+Checks of behaviour that timing alone would not catch, run on
+generated projects:
+
+    python -m urtext.benchmarks.checks [name ...]
+
+Prints each check's result and exits with 1 if any fails.
+"""
+
+import contextlib
+import io
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from urtext.project_list import ProjectList
+from urtext.__main__ import compile_project
+from urtext.buffer import UrtextBuffer
+from urtext.utils import strip_backtick_escape, get_id_from_link
+import urtext.syntax as syntax
+from urtext.file_watcher import PollingBackend, InotifyBackend
+from urtext.benchmarks.corpus import generate_corpus
+from urtext.benchmarks.suite import base_project_path
+
+CHECKS = {}
+
+class CheckFailed(Exception):
+    pass
+
+def check(function):
+    CHECKS[function.__name__] = function
+    return function
+
+def expect(condition, message):
+    if not condition:
+        raise CheckFailed(message)
+
+def wait_for(condition, timeout=120, interval=0.05):
+    """ polls condition until it is true; returns whether it became so """
+    started = time.time()
+    while time.time() - started < timeout:
+        if condition():
+            return True
+        time.sleep(interval)
+    return False
+
+def compiles_done(project_list):
+    stats = project_list.compile_scheduler.stats()
+    return not stats['depth'] and stats['running'] is None
+
+@contextlib.contextmanager
+def workspace(**params):
+    """ a temporary folder with a copy of the base project and a generated corpus """
+    with tempfile.TemporaryDirectory() as temp:
+        shutil.copytree(base_project_path, os.path.join(temp, 'base_project'))
+        generate_corpus(os.path.join(temp, 'corpus'), **params)
+        yield temp
+
+def load(temp, **kwargs):
+    return ProjectList(
+        os.path.join(temp, 'corpus'),
+        base_project_path=os.path.join(temp, 'base_project'),
+        **kwargs)
+
+def edit_generated_project(temp, project_list, steps=30, after_each=None, seed=0):
+    """
+    saves random edits to the generated corpus in temp one at a time:
+    text changed inside a node, nodes, links and metadata added or
+    changed, files restored, created and deleted. after_each(step) is
+    called once each has compiled.
+    """
+    rng = random.Random(seed)
+    corpus = os.path.join(temp, 'corpus')
+    originals = {}
+    added_files = []
+    for step in range(steps):
+        filename = os.path.join(corpus, 'note-%05d.urtext' % rng.randrange(20))
+        with open(filename, encoding='utf-8') as f:
+            contents = f.read()
+        originals.setdefault(filename, contents)
+        edit = step % 6
+        if edit == 0:
+            contents = contents.replace('other things', 'other things %d' % step, 1)
+        elif edit == 1:
+            contents += '{ Edited %d _ key1:: value%d | Note %d > }\n' % (
+                step, step % 5, rng.randrange(20))
+        elif edit == 2:
+            contents = re.sub(r'key(\d+):: value\d+', r'key\1:: value%d' % rng.randrange(5), contents, 1)
+        elif edit == 3:
+            contents = originals[filename]
+        elif edit == 4:
+            filename = os.path.join(corpus, 'added-%d.urtext' % step)
+            added_files.append(filename)
+            contents = 'Added File %d _\nkey2:: value%d\nSee | Note %d >\n' % (
+                step, step % 5, rng.randrange(20))
+        if edit == 5 and added_files:
+            os.remove(added_files.pop(0))
+        else:
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(contents)
+        project_list.on_modified(filename)
+        if after_each:
+            after_each(step)
+
+@check
+def save_during_initialize():
+    """
+    a node saved while its project runs its first compile is in the
+    project once that has finished
+    """
+    with workspace(files=300, frames=80) as temp:
+        project_list = load(temp, is_async=True, compile_delay=0)
+        try:
+            expect(wait_for(
+                    lambda: len(project_list.projects) == 2 and project_list.projects[1].initialized,
+                    interval=0.001),
+                'the project did not start compiling')
+            project = project_list.projects[1]
+            expect(not project.compiled, 'the project compiled before the save')
+            filename = os.path.join(temp, 'corpus', 'note-00000.urtext')
+            with open(filename, 'a', encoding='utf-8') as f:
+                f.write('{ Saved During Initialize _ }\n')
+            project_list.on_modified(filename)
+            expect(wait_for(lambda: project.compiled and compiles_done(project_list)),
+                'the project did not compile')
+            expect('Saved During Initialize' in project.nodes,
+                'the node saved during initialization is missing')
+        finally:
+            project_list.stop_watching_files()
+
+@check
+def save_futures():
+    """
+    the futures on_modified returns resolve once the compile covering
+    each save has run, including saves coalesced into one compile
+    """
+    with workspace(files=40, frames=4) as temp:
+        project_list = load(temp, is_async=True, compile_delay=0.05)
+        try:
+            expect(wait_for(lambda: len(project_list.projects) == 2 and project_list.projects[1].compiled),
+                'the project did not compile')
+            project = project_list.projects[1]
+            filename = os.path.join(temp, 'corpus', 'note-00000.urtext')
+            futures = []
+            for save in range(3):
+                with open(filename, 'a', encoding='utf-8') as f:
+                    f.write('{ Saved %d _ }\n' % save)
+                futures.append(project_list.on_modified(filename))
+            for future in futures:
+                future.result(timeout=120)
+            expect('Saved 2' in project.nodes, 'a future resolved before its save compiled')
+            expect(project_list.compile_scheduler.stats()['compiled'] < len(futures),
+                'the saves were not coalesced')
+        finally:
+            project_list.stop_watching_files()
+
+@check
+def snapshot_readers():
+    """
+    threads reading project.snapshot while saves add, change and
+    remove nodes see no errors, and the last snapshot matches the
+    project
+    """
+    with workspace(files=100, frames=10) as temp:
+        project_list = load(temp, is_async=True, compile_delay=0.01)
+        try:
+            expect(wait_for(lambda: len(project_list.projects) == 2 and project_list.projects[1].compiled),
+                'the project did not compile')
+            project = project_list.projects[1]
+            stop = threading.Event()
+            errors = []
+            reads = [0]
+
+            def read():
+                while not stop.is_set():
+                    try:
+                        snapshot = project.snapshot
+                        expect(len(snapshot.sort_for_node_browser()) == len(snapshot.nodes),
+                            'the node browser order is missing nodes')
+                        for filename in list(snapshot.files)[:10]:
+                            # node fields can change after publishing,
+                            # so positions come from the snapshot
+                            for start in snapshot.positions[filename][0]:
+                                expect(snapshot.get_node_from_position(filename, start) is not None,
+                                    'no node at a node\'s position')
+                            for node in snapshot.get_file_nodes(filename):
+                                snapshot.get_links_to(node.id)
+                                snapshot.get_links_from(node.id)
+                        reads[0] += 1
+                    except Exception as e:
+                        errors.append(e)
+
+            readers = [threading.Thread(target=read) for _ in range(3)]
+            for reader in readers:
+                reader.start()
+            rng = random.Random(0)
+            first_version = project.snapshot.version
+            originals = {}
+            for generation in range(1, 60):
+                filename = os.path.join(temp, 'corpus', 'note-%05d.urtext' % rng.randrange(100))
+                with open(filename, encoding='utf-8') as f:
+                    contents = f.read()
+                originals.setdefault(filename, contents)
+                if generation % 3 == 0:
+                    # drops the nodes added to it
+                    contents = originals[filename]
+                else:
+                    contents += '{ Added %d _ key1:: value%d | Note %d > }\n' % (
+                        generation, generation % 5, rng.randrange(100))
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(contents)
+                project_list.on_modified(filename)
+                time.sleep(0.02)
+            expect(wait_for(lambda: compiles_done(project_list)), 'the saves did not compile')
+            time.sleep(0.2)
+            stop.set()
+            for reader in readers:
+                reader.join()
+
+            expect(not errors, 'readers raised %s' % errors[:3])
+            expect(reads[0], 'no reads completed')
+            snapshot = project.snapshot
+            expect(snapshot.version > first_version, 'no snapshot was published')
+            expect([n.id for n in snapshot.get_nodes()] == list(project.nodes),
+                'the snapshot\'s nodes differ from the project\'s')
+            file_nodes = {}
+            for node in project.nodes.values():
+                file_nodes.setdefault(node.filename, []).append(node.id)
+            expect({f: [n.id for n in nodes] for f, nodes in snapshot.files.items()} == file_nodes,
+                'the snapshot\'s files differ from the project\'s')
+            for target_id in project.links_to:
+                expect([n.id for n in snapshot.get_links_to(target_id)]
+                        == [n.id for n in project.get_links_to(target_id)],
+                    'backlinks to %s differ' % target_id)
+            for node_id in project.nodes:
+                expect([n.id for n in snapshot.get_links_from(node_id)]
+                        == [n.id for n in project.get_links_from(node_id)],
+                    'links from %s differ' % node_id)
+            for filename in project.files:
+                expect([n.id for n in snapshot.get_file_nodes(filename)]
+                        == [n.id for n in sorted(project.files[filename].nodes, key=lambda n: n.start_position)],
+                    'the outline of %s differs' % filename)
+            expect([n.id for n, detail in snapshot.sort_for_node_browser()]
+                    == [n.id for n in project.sort_for_node_browser()],
+                'the node browser order differs')
+        finally:
+            project_list.stop_watching_files()
+
+@check
+def file_watcher():
+    """
+    files created, modified, renamed and deleted outside the editor
+    are brought into the project, with each backend available
+    """
+    backends = [PollingBackend]
+    if InotifyBackend.available():
+        backends.append(InotifyBackend)
+    for backend in backends:
+        with workspace(files=20, frames=2) as temp:
+            project_list = load(temp, is_async=False, watch_files=True)
+            try:
+                watcher = project_list.file_watcher
+                watcher.backend.close()
+                watcher.backend = backend()
+                project = project_list.projects[1]
+                project_list.check_watched_files()
+                name = backend.__name__
+                corpus = os.path.join(temp, 'corpus')
+
+                created = os.path.join(corpus, 'watched.urtext')
+                with open(created, 'w', encoding='utf-8') as f:
+                    f.write('Watched Created _\n')
+                project_list.check_watched_files()
+                expect('Watched Created' in project.nodes, '%s: created file not added' % name)
+
+                with open(created, 'w', encoding='utf-8') as f:
+                    f.write('Watched Modified _\nwith more text\n')
+                project_list.check_watched_files()
+                expect('Watched Modified' in project.nodes and 'Watched Created' not in project.nodes,
+                    '%s: modified file not parsed again' % name)
+
+                renamed = os.path.join(corpus, 'watched-renamed.urtext')
+                os.rename(created, renamed)
+                project_list.check_watched_files()
+                expect(renamed in project.files and created not in project.files,
+                    '%s: renamed file not followed' % name)
+                expect(project.nodes.get('Watched Modified') is not None
+                        and project.nodes['Watched Modified'].filename == renamed,
+                    '%s: renamed file\'s node not moved' % name)
+
+                os.remove(renamed)
+                project_list.check_watched_files()
+                expect(renamed not in project.files and 'Watched Modified' not in project.nodes,
+                    '%s: deleted file not dropped' % name)
+            finally:
+                project_list.stop_watching_files()
+
+@check
+def project_paths():
+    """
+    saves look projects up without rebuilding the directory map, which
+    is rebuilt after settings change
+    """
+    with workspace(files=20, frames=2) as temp:
+        project_list = load(temp, is_async=False)
+        try:
+            project = project_list.projects[1]
+            filename = os.path.join(temp, 'corpus', 'note-00000.urtext')
+            expect(project_list._get_project_from_path(filename) is project,
+                'the file\'s project was not found')
+            project_paths = project_list.project_paths
+            for _ in range(5):
+                project_list.on_modified(filename)
+            expect(project_list.project_paths is project_paths,
+                'saves rebuilt the directory map')
+            project_list.settings_changed()
+            expect(project_list._get_project_from_path(filename) is project,
+                'the file\'s project was not found after settings changed')
+            expect(project_list.project_paths is not project_paths,
+                'the directory map was not rebuilt after settings changed')
+        finally:
+            project_list.stop_watching_files()
+
+@check
+def links_index():
+    """
+    the reverse link index matches a full scan after each edit, and
+    backlinks match those of a fresh load of the edited files
+    """
+    with workspace(files=40, frames=8) as temp:
+        project_list = load(temp, is_async=False)
+        fresh_list = None
+        try:
+            project = project_list.projects[1]
+
+            def after_each(step):
+                expect(project._links_index_is_consistent(),
+                    'the link index differs from a scan after step %d' % step)
+                expect(project._node_indexes_are_consistent(),
+                    'the node indexes differ from a scan after step %d' % step)
+
+            edit_generated_project(temp, project_list, after_each=after_each)
+            fresh_list = load(temp, is_async=False)
+            fresh = fresh_list.projects[1]
+            expect(set(project.nodes) == set(fresh.nodes),
+                'nodes differ from a fresh load')
+            expect(set(project.links_to) == set(fresh.links_to),
+                'link targets differ from a fresh load')
+            for target_id in fresh.links_to:
+                expect(set(n.id for n in project.get_links_to(target_id))
+                        == set(n.id for n in fresh.get_links_to(target_id)),
+                    'backlinks to %s differ from a fresh load' % target_id)
+        finally:
+            project_list.stop_watching_files()
+            if fresh_list:
+                fresh_list.stop_watching_files()
+
+@check
+def metadata_index():
+    """
+    the metadata index matches a rebuild after each edit, and metadata
+    queries match those on a fresh load of the edited files
+    """
+    with workspace(files=40, frames=8) as temp:
+        project_list = load(temp, is_async=False)
+        fresh_list = None
+        try:
+            project = project_list.projects[1]
+
+            def after_each(step):
+                expect(project.metadata_index.is_consistent(),
+                    'the metadata index differs from a rebuild after step %d' % step)
+
+            edit_generated_project(temp, project_list, after_each=after_each)
+            fresh_list = load(temp, is_async=False)
+            fresh = fresh_list.projects[1]
+            keys = fresh.get_keys_with_frequency()
+            expect(project.get_keys_with_frequency() == keys,
+                'keys differ from a fresh load')
+            for key in keys:
+                values = fresh.get_all_values_for_key_with_frequency(key)
+                expect(project.get_all_values_for_key_with_frequency(key) == values,
+                    'values of %s differ from a fresh load' % key)
+                for value in list(values) + ['*']:
+                    expect(set(n.id for n in project.get_by_meta(key, value, '='))
+                            == set(n.id for n in fresh.get_by_meta(key, value, '=')),
+                        'nodes with %s:: %s differ from a fresh load' % (key, value))
+        finally:
+            project_list.stop_watching_files()
+            if fresh_list:
+                fresh_list.stop_watching_files()
+
+@check
+def search_index():
+    """
+    the search index matches a rebuild after each edit, and searches
+    match those on a fresh load of the edited files
+    """
+    queries = ['other things', 'things 1', 'edited', 'added file', 'value3', 'no', 'zzz']
+    with workspace(files=40, frames=8) as temp:
+        project_list = load(temp, is_async=False)
+        fresh_list = None
+        try:
+            project = project_list.projects[1]
+            # the index is built on the first search
+            project.search(queries[0])
+
+            def after_each(step):
+                expect(project.search_index.is_consistent(),
+                    'the search index differs from a rebuild after step %d' % step)
+
+            edit_generated_project(temp, project_list, after_each=after_each)
+            fresh_list = load(temp, is_async=False)
+            fresh = fresh_list.projects[1]
+            for query in queries:
+                expect(set(n.id for n in project.search(query))
+                        == set(n.id for n in fresh.search(query)),
+                    'search results for "%s" differ from a fresh load' % query)
+                expect(set(n.id for n in project.get_by_meta('_contents', query, '?'))
+                        == set(n.id for n in fresh.get_by_meta('_contents', query, '?')),
+                    '_contents ? "%s" differs from a fresh load' % query)
+        finally:
+            project_list.stop_watching_files()
+            if fresh_list:
+                fresh_list.stop_watching_files()
+
+@check
+def incremental_compile():
+    """
+    with verify_incremental_compile on, no frame skipped after an edit
+    would have changed its output, and a fresh load of the edited
+    files writes nothing new
+    """
+    with workspace(files=40, frames=16) as temp:
+        corpus = os.path.join(temp, 'corpus')
+        with open(os.path.join(corpus, 'project_settings.urtext'), 'a', encoding='utf-8') as f:
+            f.write('verify_incremental_compile:: true\n')
+        project_list = load(temp, is_async=False)
+        fresh_list = None
+        try:
+            project = project_list.projects[1]
+            expect(project.setting_is_true('verify_incremental_compile'),
+                'verify_incremental_compile is not on')
+
+            def after_each(step):
+                for filename, messages in project.messages.items():
+                    for message in messages:
+                        expect('skipped by incremental compile' not in message['top_message'],
+                            'after step %d: %s' % (step, message['top_message']))
+
+            edit_generated_project(temp, project_list, after_each=after_each)
+            written = {}
+            for filename in os.listdir(corpus):
+                with open(os.path.join(corpus, filename), encoding='utf-8') as f:
+                    written[filename] = f.read()
+            fresh_list = load(temp, is_async=False)
+            for filename in sorted(written):
+                with open(os.path.join(corpus, filename), encoding='utf-8') as f:
+                    expect(f.read() == written[filename],
+                        'a fresh load rewrote %s' % filename)
+        finally:
+            project_list.stop_watching_files()
+            if fresh_list:
+                fresh_list.stop_watching_files()
+
+@check
+def dry_run():
+    """
+    a dry run compile writes nothing, in or outside the project, and
+    reports the files a compile then changes, including the keymap
+    the starter project's keybindings node writes outside it
+    """
+    with tempfile.TemporaryDirectory() as temp:
+        # the keybindings call writes the keymap beside the folder
+        # holding the base project, kept inside temp here
+        base_project = os.path.join(temp, 'urtext', 'base_project')
+        shutil.copytree(base_project_path, base_project)
+        project = os.path.join(temp, 'starter_project')
+        shutil.copytree(os.path.join(os.path.dirname(base_project_path), 'starter_project'), project)
+        keymap = os.path.join(temp, 'Default.sublime-keymap')
+
+        def signatures():
+            found = {}
+            for root, dirs, files in os.walk(temp):
+                for f in files:
+                    stat = os.stat(os.path.join(root, f))
+                    found[os.path.join(root, f)] = (stat.st_mtime_ns, stat.st_size)
+            return found
+
+        def contents():
+            found = {}
+            for root, dirs, files in os.walk(temp):
+                for f in files:
+                    with open(os.path.join(root, f), 'rb') as opened:
+                        found[os.path.join(root, f)] = opened.read()
+            return found
+
+        before = signatures()
+        with open(os.devnull, 'w') as log:
+            report = compile_project(project, base_project_path=base_project, dry_run=True, log=log)
+        expect(signatures() == before, 'the dry run wrote files')
+        expect(keymap in report['changed'], 'the dry run did not report the keymap')
+
+        # file targets rewrite their file even when the output is the
+        # same, so compare what the compile changed by contents
+        before = contents()
+        with open(os.devnull, 'w') as log:
+            compile_project(project, base_project_path=base_project, log=log)
+        after = contents()
+        changed = sorted(
+            f if os.path.relpath(f, project).startswith(os.pardir) else os.path.relpath(f, project)
+            for f in set(before) | set(after) if before.get(f) != after.get(f))
+        expect(keymap in changed, 'the compile did not write the keymap')
+        expect(report['changed'] == changed,
+            'the dry run reported %s, the compile changed %s' % (report['changed'], changed))
+
+class _Lexed:
+    """ stands in for a buffer, which _lex() only adds meta_to_node matches to """
+
+    def __init__(self):
+        self.meta_to_node = []
+
+def multi_pattern_lex(buffer, contents, start_position=0):
+    """
+    the lexer as it was before symbols were combined into one pattern,
+    running each symbol's pattern over the contents in turn
+    """
+    symbols = {}
+    embedded_syntaxes = []
+    ranges, contents = strip_backtick_escape(contents)
+
+    for match in syntax.embedded_syntax_c.finditer(contents):
+        embedded_syntaxes.append([match.start(), match.end()])
+    for symbol, symbol_type in syntax.compiled_symbols.items():
+        for match in symbol.finditer(contents):
+            is_embedded = False
+            for r in embedded_syntaxes:
+                if match.start() in range(r[0], r[1]):
+                    is_embedded = True
+                    break
+            if is_embedded:
+                continue
+            if symbol_type == 'meta_to_node':
+                buffer.meta_to_node.append(match)
+                continue
+
+            if symbol_type == 'pointer':
+                symbols[match.start() + start_position] = {}
+                symbols[match.start() + start_position]['contents'] = get_id_from_link(match.group())
+                symbols[match.start() + start_position]['type'] = symbol_type
+            elif symbol_type == 'compact_node':
+                symbols[match.start() + start_position + len(match.group(1))] = {}
+                symbols[match.start() + start_position + len(match.group(1))]['type'] = symbol_type
+                symbols[match.start() + start_position + len(match.group(1))]['contents'] = match.group(3)
+            else:
+                symbols[match.start() + start_position] = {}
+                symbols[match.start() + start_position]['type'] = symbol_type
+
+    symbols[len(contents) + start_position] = { 'type': 'EOB' }
+    return symbols
+
+def _lex_with(lex, contents, start_position=0):
+    buffer = _Lexed()
+    symbols = lex(buffer, contents, start_position=start_position)
+    return symbols, [(m.span(), m.group()) for m in buffer.meta_to_node]
+
+@check
+def lexer():
+    """
+    the single pass lexer finds the same symbols as the one running
+    each symbol's pattern in turn, on the base project and a generated
+    corpus, including compact nodes' contents
+    """
+    with workspace(files=300, frames=40) as temp:
+        filenames = []
+        for folder in ['base_project', 'corpus']:
+            for root, dirs, files in os.walk(os.path.join(temp, folder)):
+                filenames.extend(os.path.join(root, f) for f in sorted(files) if f.endswith('.urtext'))
+        expect(filenames, 'no files to lex')
+        compared = 0
+        for filename in filenames:
+            with open(filename, encoding='utf-8') as f:
+                pending = [(f.read(), 0)]
+            while pending:
+                contents, start_position = pending.pop()
+                expected = _lex_with(multi_pattern_lex, contents, start_position)
+                found = _lex_with(UrtextBuffer._lex, contents, start_position)
+                expect(found == expected, 'symbols differ in %s at %d:\n%s\n%s' % (
+                    os.path.basename(filename), start_position, expected, found))
+                compared += 1
+                for position, symbol in expected[0].items():
+                    if symbol['type'] == 'compact_node':
+                        pending.append((symbol['contents'], position + 1))
+        print('compared %d lexes of %d files' % (compared, len(filenames)))
+
+def main(argv=None):
+    names = argv if argv else list(CHECKS)
+    failed = []
+    for name in names:
+        started = time.time()
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                CHECKS[name]()
+        except Exception:
+            failed.append(name)
+            print('FAIL %s (%.1fs)' % (name, time.time() - started))
+            print(output.getvalue(), end='')
+            traceback.print_exc()
+        else:
+            print('ok   %s (%.1fs)' % (name, time.time() - started))
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
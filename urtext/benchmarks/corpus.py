@@ -0,0 +1,89 @@
+import os
+import random
+
+DEFAULTS = {
+    'files': 200,           # files of notes, besides frames and settings
+    'depth': 2,             # levels of nodes nested in each file
+    'children': 2,          # nodes nested in each node, per level
+    'compact_ratio': 0.3,   # share of nested nodes written as compact (bullet) nodes
+    'links': 2,             # links to other notes, per node
+    'meta_keys': 8,         # distinct metadata keys
+    'meta_values': 20,      # distinct values per key
+    'timestamps': True,     # give each root node a timestamp
+    'frames': 20,           # frames, cycling through INCLUDE, SORT, TREE and COLLECT
+    'seed': 0,
+}
+
+def generate_corpus(path, **params):
+    """
+    Writes a project of generated notes to path, the same for the
+    same parameters (see DEFAULTS), and returns the parameters used.
+    """
+    params = dict(DEFAULTS, **params)
+    rng = random.Random(params['seed'])
+    os.makedirs(path, exist_ok=True)
+    _write(path, 'project_settings.urtext', '\n'.join([
+        'project_settings _',
+        'project_title:: Benchmark',
+        'node_browser_sort:: _newest_timestamp title',
+        '']))
+
+    titles = ['Note %d' % i for i in range(params['files'])]
+    for i, title in enumerate(titles):
+        lines = [title + ' _']
+        if params['timestamps']:
+            lines.append('<2024-%02d-%02d>' % (1 + i % 12, 1 + i % 28))
+        lines.extend(_body(rng, titles, params))
+        lines.extend(_nested(rng, titles, params, title, 1))
+        _write(path, 'note-%05d.urtext' % i, '\n'.join(lines) + '\n')
+
+    for i in range(params['frames']):
+        key = 'key%d' % (i % params['meta_keys'])
+        value = 'value%d' % rng.randrange(params['meta_values'])
+        calls = [
+            '+(%s = %s) SHOW($title $_link\\n)' % (key, value),
+            '+(%s = *) SORT(%s -r) LIMIT(50) SHOW($title\\n)' % (key, key),
+            '+(| %s >) TREE(*)' % rng.choice(titles),
+            '+(*) COLLECT(%s = %s)' % (key, value),
+        ][i % 4]
+        _write(path, 'frame-%03d.urtext' % i, '\n'.join([
+            'Frame %d _' % i,
+            '[[ >(| Frame Output %d >) %s ]]' % (i, calls),
+            '{ Frame Output %d _ }' % i,
+            '']))
+    return params
+
+def _body(rng, titles, params, indent=''):
+    lines = [indent + 'Some text about %s and other things.' % rng.choice(titles)]
+    for _ in range(params['links']):
+        lines.append(indent + 'See | %s >' % rng.choice(titles))
+    key = rng.randrange(params['meta_keys'])
+    lines.append(indent + 'key%d:: value%d' % (key, rng.randrange(params['meta_values'])))
+    lines.append(indent + '#tag%d' % rng.randrange(params['meta_values']))
+    return lines
+
+def _nested(rng, titles, params, parent, level):
+    if level > params['depth']:
+        return []
+    lines = []
+    indent = '\t' * level
+    for c in range(params['children']):
+        title = '%s.%d' % (parent, c)
+        if rng.random() < params['compact_ratio']:
+            link = ' | %s >' % rng.choice(titles) if params['links'] else ''
+            lines.append('%s• %s _ key%d:: value%d%s' % (
+                indent,
+                title,
+                rng.randrange(params['meta_keys']),
+                rng.randrange(params['meta_values']),
+                link))
+            continue
+        lines.append('%s{ %s _' % (indent, title))
+        lines.extend(_body(rng, titles, params, indent=indent + '\t'))
+        lines.extend(_nested(rng, titles, params, title, level + 1))
+        lines.append(indent + '}')
+    return lines
+
+def _write(path, filename, contents):
+    with open(os.path.join(path, filename), 'w', encoding='utf-8') as f:
+        f.write(contents)
@@ -0,0 +1,91 @@
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from urtext.benchmarks.corpus import generate_corpus
+from urtext.benchmarks.suite import base_project_path, _load
+from urtext.node import UrtextNode
+from urtext.metadata import NodeMetadata
+from urtext.metadata_entry import MetadataEntry
+from urtext.metadata_value import MetadataValue
+from urtext.link import UrtextLink
+from urtext.target import UrtextTarget
+from urtext.timestamp import UrtextTimestamp
+
+CLASSES = [
+    UrtextNode,
+    NodeMetadata,
+    MetadataEntry,
+    MetadataValue,
+    UrtextLink,
+    UrtextTarget,
+    UrtextTimestamp,
+]
+
+def measure_memory(workspace=None, **params):
+    """
+    Generates a corpus (see corpus.DEFAULTS for params) and measures
+    the memory the loaded project takes: in all, per node, and per
+    instance of each class of the data model, counting an instance's
+    __dict__ if it has one.
+    """
+    if workspace is None:
+        with tempfile.TemporaryDirectory() as temp:
+            return measure_memory(os.path.join(temp, 'run'), **params)
+
+    corpus_path = os.path.join(workspace, 'corpus')
+    base_path = os.path.join(workspace, 'base_project')
+    if os.path.exists(workspace):
+        shutil.rmtree(workspace)
+    os.makedirs(workspace)
+    shutil.copytree(base_project_path, base_path)
+    params = generate_corpus(corpus_path, **params)
+
+    tracemalloc.start()
+    try:
+        # the base project alone, to leave out of the corpus' share
+        project_list = _load(base_path, base_path)
+        base_bytes = _traced_bytes()
+        project_list.stop_watching_files()
+        del project_list
+        gc.collect()
+
+        start_bytes = _traced_bytes()
+        project_list = _load(corpus_path, base_path)
+        corpus_bytes = _traced_bytes() - start_bytes - base_bytes
+    finally:
+        tracemalloc.stop()
+
+    project = project_list.get_project('Benchmark')
+    classes = {}
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls in CLASSES:
+            entry = classes.setdefault(cls.__name__, [0, 0])
+            entry[0] += 1
+            entry[1] += _instance_bytes(obj)
+    project_list.stop_watching_files()
+    return {
+        'params': params,
+        'nodes': len(project.nodes),
+        'bytes': corpus_bytes,
+        'bytes_per_node': corpus_bytes / len(project.nodes) if project.nodes else None,
+        'classes': {name: {
+                'count': count,
+                'bytes_per_instance': total / count,
+            } for name, (count, total) in sorted(classes.items())},
+    }
+
+def _traced_bytes():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+def _instance_bytes(obj):
+    size = sys.getsizeof(obj)
+    if not hasattr(type(obj), '__slots__'):
+        # reading __dict__ of a slotted class would make one
+        size += sys.getsizeof(obj.__dict__)
+    return size
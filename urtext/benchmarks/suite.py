@@ -0,0 +1,175 @@
+import contextlib
+import io
+import math
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from urtext.project_list import ProjectList
+from urtext.benchmarks.corpus import generate_corpus
+
+BENCHMARKS = [
+    'startup',              # ProjectList() over the base project and the corpus
+    'initialize',           # UrtextProject.initialize() of the corpus, from each startup
+    'compile',              # UrtextProject._compile()
+    'compile_file',         # a save changing one note's metadata, with dependent frames
+    'get_by_meta',          # every key, for any value and for one value
+    'get_links_to',         # every node
+    'node_browser_sort',    # UrtextProject.sort_for_node_browser()
+]
+
+base_project_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'base_project')
+
+def run_suite(workspace=None, repeat=3, only=None, **params):
+    """
+    Generates a corpus (see corpus.DEFAULTS for params) and times
+    each benchmark `repeat` times. Returns the parameters used and
+    {benchmark: {'times', 'min', 'median', 'mean'}} in seconds.
+    """
+    if workspace is None:
+        with tempfile.TemporaryDirectory() as temp:
+            return run_suite(os.path.join(temp, 'run'), repeat=repeat, only=only, **params)
+
+    selected = [b for b in BENCHMARKS if not only or b in only]
+    corpus_path = os.path.join(workspace, 'corpus')
+    base_path = os.path.join(workspace, 'base_project')
+    if os.path.exists(workspace):
+        shutil.rmtree(workspace)
+    os.makedirs(workspace)
+    # a copy, since the base project writes files next to itself
+    shutil.copytree(base_project_path, base_path)
+    params = generate_corpus(corpus_path, **params)
+
+    times = {b: [] for b in selected}
+    project_list = None
+    for _ in range(repeat if 'startup' in selected or 'initialize' in selected else 1):
+        start = time.perf_counter()
+        project_list = _load(corpus_path, base_path)
+        if 'startup' in times:
+            times['startup'].append(time.perf_counter() - start)
+        if 'initialize' in times:
+            times['initialize'].append(project_list.get_project('Benchmark').last_compile_time)
+    project = project_list.get_project('Benchmark')
+
+    if 'compile' in times:
+        for _ in range(repeat):
+            with _quiet():
+                start = time.perf_counter()
+                project._compile()
+                times['compile'].append(time.perf_counter() - start)
+
+    if 'compile_file' in times:
+        filename = os.path.join(corpus_path, 'note-%05d.urtext' % (params['files'] // 2))
+        with open(filename, encoding='utf-8') as f:
+            contents = f.read()
+        for i in range(repeat):
+            contents = re.sub(r'(key\d+):: value\d+', r'\1:: value%d' % (i % params['meta_values']), contents, count=1)
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(contents)
+            with _quiet():
+                start = time.perf_counter()
+                project_list.on_modified(filename)
+                times['compile_file'].append(time.perf_counter() - start)
+
+    if 'get_by_meta' in times:
+        keys = ['key%d' % k for k in range(params['meta_keys'])]
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for key in keys:
+                project.get_by_meta(key, '*', '=')
+                project.get_by_meta(key, 'value1', '=')
+            times['get_by_meta'].append(time.perf_counter() - start)
+
+    if 'get_links_to' in times:
+        node_ids = list(project.nodes)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for node_id in node_ids:
+                project.get_links_to(node_id)
+            times['get_links_to'].append(time.perf_counter() - start)
+
+    if 'node_browser_sort' in times:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            project.sort_for_node_browser()
+            times['node_browser_sort'].append(time.perf_counter() - start)
+
+    project_list.stop_watching_files()
+    return {
+        'params': params,
+        'nodes': len(project.nodes),
+        'results': {b: _summarize(t) for b, t in times.items()},
+    }
+
+def run_scaling(sizes, threshold=1.25, workspace=None, repeat=3, only=None, **params):
+    """
+    Runs the suite at each number of files in sizes and fits how
+    each benchmark's median grows with the number of nodes. Growth
+    exponents above threshold are flagged as super-linear.
+    """
+    runs = []
+    for files in sizes:
+        runs.append(run_suite(workspace=workspace, repeat=repeat, only=only, files=files, **params))
+    exponents = {}
+    for benchmark in runs[0]['results']:
+        exponents[benchmark] = _growth_exponent(
+            [r['nodes'] for r in runs],
+            [r['results'][benchmark]['median'] for r in runs])
+    return {
+        'sizes': list(sizes),
+        'threshold': threshold,
+        'runs': runs,
+        'exponents': exponents,
+        'superlinear': sorted(b for b, e in exponents.items() if e is not None and e > threshold),
+    }
+
+def environment():
+    """ what the results were measured on, to compare runs across commits """
+    commit = None
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+def _load(corpus_path, base_path):
+    with _quiet():
+        return ProjectList(corpus_path, is_async=False, base_project_path=base_path)
+
+def _quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+def _summarize(times):
+    return {
+        'times': times,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+    }
+
+def _growth_exponent(sizes, times):
+    """ slope of log(time) against log(size), by least squares """
+    points = [(math.log(s), math.log(t)) for s, t in zip(sizes, times) if s > 0 and t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = statistics.mean(p[0] for p in points)
+    mean_y = statistics.mean(p[1] for p in points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
@@ -1,4 +1,5 @@
 import re
+import bisect
 from urtext.node import UrtextNode
 from urtext.utils import strip_backtick_escape, get_id_from_link
 import urtext.syntax as syntax
@@ -18,6 +19,8 @@ class UrtextBuffer:
         self.nodes = []
         self.allocated_ids = []
         self.root_node = None
+        self.position_index = None
+        self.pending_edits = {}
         self.__clear_messages()
         self._lex_and_parse()
         if not self.root_node:
@@ -38,39 +41,51 @@ class UrtextBuffer:
         self.allocated_ids = []
         self._resolve_untitled_nodes()
         self._resolve_duplicate_ids()
+        self._build_position_index()
 
     def _lex(self, contents, start_position=0):
         symbols = {}
-        embedded_syntaxes = []
+        compact_symbols = {}
         ranges, contents = strip_backtick_escape(contents)
-
+        embedded_starts = []
+        embedded_ends = []
         for match in syntax.embedded_syntax_c.finditer(contents):
-            embedded_syntaxes.append([match.start(), match.end()])
-        for symbol, symbol_type in syntax.compiled_symbols.items():
-            for match in symbol.finditer(contents):
-                is_embedded = False
-                for r in embedded_syntaxes:
-                    if match.start() in range(r[0], r[1]):
-                        is_embedded = True
-                        break
-                if is_embedded:
-                    continue
-                if symbol_type == 'meta_to_node':
-                    self.meta_to_node.append(match)
-                    continue
+            embedded_starts.append(match.start())
+            embedded_ends.append(match.end())
+
+        # end of the last accepted match of each type, to keep
+        # matches of one type from overlapping, as in finditer()
+        last_end = {}
+        for combined_match in syntax.compiled_symbols_combined_c.finditer(contents):
+            symbol_type = combined_match.lastgroup
+            position = combined_match.start()
+            if position < last_end.get(symbol_type, 0):
+                continue
+            match = syntax.compiled_symbols_by_type[symbol_type].match(contents, position)
+            last_end[symbol_type] = match.end()
 
-                if symbol_type == 'pointer':
-                    symbols[match.start() + start_position] = {}
-                    symbols[match.start() + start_position]['contents'] = get_id_from_link(match.group())
-                    symbols[match.start() + start_position]['type'] = symbol_type
-                elif symbol_type == 'compact_node':
-                    symbols[match.start() + start_position + len(match.group(1))] = {}
-                    symbols[match.start() + start_position + len(match.group(1))]['type'] = symbol_type
-                    symbols[match.start() + start_position + len(match.group(1))]['contents'] = match.group(3)
-                else:
-                    symbols[match.start() + start_position] = {}
-                    symbols[match.start() + start_position]['type'] = symbol_type
+            index = bisect.bisect_right(embedded_starts, position) - 1
+            if index > -1 and position < embedded_ends[index]:
+                continue
+            if symbol_type == 'meta_to_node':
+                self.meta_to_node.append(match)
+                continue
+
+            if symbol_type == 'pointer':
+                symbols[position + start_position] = {}
+                symbols[position + start_position]['contents'] = get_id_from_link(match.group())
+                symbols[position + start_position]['type'] = symbol_type
+            elif symbol_type == 'compact_node':
+                compact_symbols[position + start_position + len(match.group(1))] = {}
+                compact_symbols[position + start_position + len(match.group(1))]['type'] = symbol_type
+                compact_symbols[position + start_position + len(match.group(1))]['contents'] = match.group(3)
+            else:
+                symbols[position + start_position] = {}
+                symbols[position + start_position]['type'] = symbol_type
 
+        # compact nodes are keyed after the bullet, where they
+        # take precedence over a wrapper or pointer
+        symbols.update(compact_symbols)
         symbols[len(contents) + start_position] = { 'type': 'EOB' }
         return symbols
 
@@ -276,6 +291,48 @@ class UrtextBuffer:
             self.__clear_messages()
         self._lex_and_parse()
 
+    def set_node_contents(self, node, new_node_contents):
+        """
+        Replaces a node's range in the buffer. While the project is
+        batching edits, the replacement is kept until apply_edits(),
+        so node positions stay those of the last parse.
+        """
+        node = self.get_node(node.id) or node
+        start, end = node.start_position, node.end_position
+        if self.project.batched_edits is not None:
+            if (start, end) in self.pending_edits or not [
+                    r for r in self.pending_edits if r[0] < end and start < r[1]]:
+                self.pending_edits[(start, end)] = new_node_contents
+                self.project.batched_edits.add(self)
+                return
+            # overlaps an earlier edit; apply those and find the node again
+            self.apply_edits()
+            if not self.get_node(node.id):
+                # replaced along with an enclosing node
+                return
+            return self.set_node_contents(node, new_node_contents)
+        contents = self._get_contents()
+        self.set_buffer_contents(''.join([
+            contents[:start],
+            new_node_contents,
+            contents[end:]]), clear_messages=False)
+
+    def apply_edits(self):
+        """ applies batched node edits in one pass and re-parses once """
+        if not self.pending_edits:
+            return False
+        contents = self._get_contents()
+        new_contents = []
+        last_end = 0
+        for start, end in sorted(self.pending_edits):
+            new_contents.append(contents[last_end:start])
+            new_contents.append(self.pending_edits[(start, end)])
+            last_end = end
+        new_contents.append(contents[last_end:])
+        self.pending_edits = {}
+        self.set_buffer_contents(''.join(new_contents), clear_messages=False)
+        return True
+
     def write_buffer_contents(self, run_hook=None):
         self.project.run_editor_method(
             'set_buffer',
@@ -410,11 +467,199 @@ class UrtextBuffer:
             child.parent = start_node
             self._assign_parents(child)
 
-    def get_node_from_position(self, position):
+    def reparse_changed_node(self, new_contents):
+        """
+        When new_contents differs from the current contents only
+        inside one range of one node, and the node structure is
+        unchanged, rebuilds only that node and shifts the positions
+        of the others. Returns (old node, new node), (None, None) if
+        nothing changed, or None if the whole buffer must be parsed.
+        """
+        contents = self._get_contents()
+        if new_contents is None or self.identifier:
+            return None
+        if self.has_errors or self.messages or self.meta_to_node or not self.root_node:
+            return None
+        if new_contents == contents:
+            return None, None
+        if syntax.urtext_messages_c.search(new_contents):
+            return None
+
+        change_start = _common_prefix_length(contents, new_contents)
+        suffix_length = _common_suffix_length(
+            contents,
+            new_contents,
+            min(len(contents), len(new_contents)) - change_start)
+        old_change_end = len(contents) - suffix_length
+        new_change_end = len(new_contents) - suffix_length
+        offset = len(new_contents) - len(contents)
+
+        # all symbols match within a line, so re-lexing the changed
+        # lines is enough, unless they are inside a backtick escape
+        # or embedded syntax, which can span lines.
+        window_start = contents.rfind('\n', 0, change_start) + 1
+        old_window_end = contents.find('\n', old_change_end)
+        if old_window_end == -1:
+            old_window_end = len(contents)
+        new_window_end = old_window_end + offset
+        old_window = contents[window_start:old_window_end]
+        new_window = new_contents[window_start:new_window_end]
+        for window in [old_window, new_window]:
+            if '`' in window or '%%' in window:
+                return None
+            # compact node ranges are taken relative to the bullet
+            if '•' in window:
+                return None
+        if new_contents.count('`', 0, window_start) % 2:
+            return None
+        ranges, stripped_contents = strip_backtick_escape(new_contents)
+        for match in syntax.embedded_syntax_c.finditer(stripped_contents):
+            if match.start() < new_window_end and match.end() > window_start:
+                return None
+
+        old_symbols = self._lex(old_window, start_position=window_start)
+        new_symbols = self._lex(new_window, start_position=window_start)
+        del old_symbols[old_window_end]
+        del new_symbols[new_window_end]
+        if self.meta_to_node:
+            self.meta_to_node = []
+            return None
+        if len(old_symbols) != len(new_symbols):
+            return None
+        for position in old_symbols:
+            if change_start <= position <= old_change_end:
+                return None
+            new_position = position if position < change_start else position + offset
+            if new_symbols.get(new_position) != old_symbols[position]:
+                return None
+
+        # exactly one range may touch the changed region,
+        # and it must contain all of it
+        if not self.position_index or self.position_index['nodes'] is not self.nodes:
+            self._build_position_index()
+        starts = self.position_index['starts']
+        ends = self.position_index['ends']
+        max_ends = self.position_index['max_ends']
+        node_indexes = self.position_index['node_indexes']
+        touching = []
+        i = bisect.bisect_right(starts, old_change_end) - 1
+        while i > -1 and max_ends[i] >= change_start:
+            if ends[i] >= change_start:
+                touching.append(i)
+            i -= 1
+        if len(touching) != 1:
+            return None
+        i = touching[0]
+        if starts[i] > change_start or ends[i] < old_change_end:
+            return None
+        changed_node = self.nodes[node_indexes[i]]
+        if changed_node.compact:
+            return None
+
+        # no other range ends inside the change, so starts up to and
+        # ends before change_start stay put, the rest move by offset
+        changed_ranges = [[
+                r[0] if r[0] <= change_start else r[0] + offset,
+                r[1] if r[1] < change_start else r[1] + offset
+            ] for r in changed_node.ranges]
+        if changed_node.root_node:
+            node_source = stripped_contents
+        else:
+            node_source = new_contents
+        new_node = self.urtext_node(
+            ''.join([node_source[r[0]:r[1]] for r in changed_ranges]),
+            self.project,
+            root=changed_node.root_node,
+            compact=changed_node.compact,
+            nested=changed_node.nested)
+        if new_node.title != changed_node.title or new_node.untitled:
+            return None
+
         for node in self.nodes:
-            for r in node.ranges:       
-                if position in range(r[0],r[1]+1): # +1 in case the cursor is in the last position of the node.
-                    return node
+            if node.end_position < change_start:
+                continue
+            node.ranges = [[
+                    r[0] if r[0] <= change_start else r[0] + offset,
+                    r[1] if r[1] < change_start else r[1] + offset
+                ] for r in node.ranges]
+            node.start_position = node.ranges[0][0]
+            node.end_position = node.ranges[-1][1]
+            if node.pointers:
+                node.pointers = [{
+                        'id' : pointer['id'],
+                        'position' : pointer['position'] + (
+                            offset if pointer['position'] > change_start else 0)
+                    } for pointer in node.pointers]
+
+        new_node.ranges = changed_node.ranges
+        new_node.start_position = changed_node.start_position
+        new_node.end_position = changed_node.end_position
+        new_node.pointers = changed_node.pointers
+        new_node.parent = changed_node.parent
+        new_node.children = changed_node.children
+        for child in new_node.children:
+            child.parent = new_node
+        if new_node.parent:
+            siblings = new_node.parent.children
+            siblings[siblings.index(changed_node)] = new_node
+        new_node.buffer = self
+        new_node.filename = self.filename
+        new_node.file = self
+
+        self.contents = new_contents
+        self.nodes[node_indexes[i]] = new_node
+        if new_node.root_node:
+            self.root_node = new_node
+        self.position_index['starts'] = [
+            s if s <= change_start else s + offset for s in starts]
+        self.position_index['ends'] = [
+            e if e < change_start else e + offset for e in ends]
+        self.position_index['max_ends'] = [
+            e if e < change_start else e + offset for e in max_ends]
+        return changed_node, new_node
+
+    def get_node_from_position(self, position):
+        if not self.position_index or self.position_index['nodes'] is not self.nodes:
+            self._build_position_index()
+        starts = self.position_index['starts']
+        ends = self.position_index['ends']
+        max_ends = self.position_index['max_ends']
+        node_indexes = self.position_index['node_indexes']
+
+        # +1 in case the cursor is in the last position of the node,
+        # so ranges sharing an end/start both match; the node
+        # added first (the innermost) wins, as before.
+        found = None
+        i = bisect.bisect_right(starts, position) - 1
+        while i > -1 and max_ends[i] >= position:
+            if ends[i] >= position and (found is None or node_indexes[i] < found):
+                found = node_indexes[i]
+            i -= 1
+        if found is not None:
+            return self.nodes[found]
+
+    def _build_position_index(self):
+        """
+        Flattens node ranges, sorted by start, with the running
+        maximum end so lookups can stop scanning backward early.
+        """
+        flattened = []
+        for node_index, node in enumerate(self.nodes):
+            for r in node.ranges:
+                flattened.append((r[0], r[1], node_index))
+        flattened.sort()
+        max_ends = []
+        max_end = -1
+        for r in flattened:
+            max_end = max(max_end, r[1])
+            max_ends.append(max_end)
+        self.position_index = {
+            'nodes' : self.nodes,
+            'starts' : [r[0] for r in flattened],
+            'ends' : [r[1] for r in flattened],
+            'max_ends' : max_ends,
+            'node_indexes' : [r[2] for r in flattened],
+        }
 
     def node_ids(self):
         return [n.id for n in self.nodes]
@@ -431,4 +676,27 @@ class UrtextBuffer:
         if message not in self.messages:
             self.messages.append()
 
-        
\ No newline at end of file
+        
+
+def _common_prefix_length(a, b):
+    length = min(len(a), len(b))
+    step = 4096
+    start = 0
+    while start < length and a[start:start + step] == b[start:start + step]:
+        start += step
+    end = min(start + step, length)
+    while start < end and a[start] == b[start]:
+        start += 1
+    return start
+
+def _common_suffix_length(a, b, limit):
+    step = 4096
+    length = 0
+    while length < limit:
+        size = min(step, limit - length)
+        if a[len(a) - length - size:len(a) - length] != b[len(b) - length - size:len(b) - length]:
+            break
+        length += size
+    while length < limit and a[len(a) - length - 1] == b[len(b) - length - 1]:
+        length += 1
+    return length
@@ -17,6 +17,7 @@ class UrtextCall:
     project_instance = False
     project_list_instance = False
     is_manual = False
+    tracks_reads = False  # True if the call reads the project only through recorded project methods
     
     def __init__(self, project_or_project_list):
         self.keys_with_flags = []
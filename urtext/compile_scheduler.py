@@ -0,0 +1,105 @@
+import concurrent.futures
+import threading
+
+class CompileScheduler:
+    """
+    Debounces compiles on save, per file. Each save starts a short
+    timer; a newer save of the same file before the timer fires
+    replaces it. A file already waiting on the executor is not
+    queued again, since its compile reads the file when it runs.
+    Each save gets a future, resolved by the compile that covers it.
+    """
+
+    def __init__(self, project_list, delay=0.1):
+        self.project_list = project_list
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.timers = {}        # filename -> timer that will queue its compile
+        self.queued = set()     # filenames waiting on the executor
+        self.running = None     # filename being compiled
+        self.futures = {}       # filename -> futures of saves its next compile covers
+        self.counts = {
+            'requested': 0,     # calls to schedule()
+            'superseded': 0,    # timers replaced by a newer save
+            'coalesced': 0,     # compiles dropped because one was already queued
+            'compiled': 0,
+        }
+
+    def schedule(self, filename):
+        """
+        Returns a Future with the result of the compile that covers
+        this save, whether it is this save's own or one it was
+        coalesced into.
+        """
+        future = concurrent.futures.Future()
+        with self.lock:
+            self.counts['requested'] += 1
+            self.futures.setdefault(filename, []).append(future)
+            timer = self.timers.pop(filename, None)
+            if timer:
+                timer.cancel()
+                self.counts['superseded'] += 1
+            timer = threading.Timer(self.delay, self._queue, args=[filename])
+            timer.daemon = True
+            self.timers[filename] = timer
+            timer.start()
+        return future
+
+    def flush(self):
+        """ queues every pending compile without waiting for its timer """
+        with self.lock:
+            timers = list(self.timers.items())
+        for filename, timer in timers:
+            timer.cancel()
+            self._queue(filename, timer=timer)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts)
+            stats['pending'] = len(self.timers)
+            stats['queued'] = len(self.queued)
+            stats['depth'] = stats['pending'] + stats['queued']
+            stats['running'] = self.running
+            return stats
+
+    def _queue(self, filename, timer=None):
+        if timer is None:
+            timer = threading.current_thread()
+        with self.lock:
+            if self.timers.get(filename) is not timer:
+                # superseded or already flushed
+                return
+            del self.timers[filename]
+            if filename in self.queued:
+                self.counts['coalesced'] += 1
+                return
+            self.queued.add(filename)
+        self.project_list.execute(self._compile, filename)
+
+    def _compile(self, filename):
+        if self.project_list.defer_while_initializing(self._compile, filename):
+            # stays queued, so newer saves still coalesce into it
+            return
+        with self.lock:
+            self.queued.discard(filename)
+            self.running = filename
+            # saves after this point wait for the next compile
+            futures = self.futures.pop(filename, [])
+        result = error = None
+        try:
+            result = self.project_list._on_modified(filename)
+        except BaseException as e:
+            error = e
+        with self.lock:
+            self.running = None
+            self.counts['compiled'] += 1
+        for future in futures:
+            if not future.set_running_or_notify_cancel():
+                continue
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        if error:
+            raise error
+        return result
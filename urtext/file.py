@@ -6,6 +6,7 @@ class UrtextFile(UrtextBuffer):
    
     def __init__(self, filename, project):
         self.filename = filename
+        self.project = project
         super().__init__(project, filename, self._read_contents())
 
     def _get_contents(self):
@@ -15,9 +16,13 @@ class UrtextFile(UrtextBuffer):
 
     def _read_contents(self):
         """ returns the file contents, filtering out Unicode Errors, directories, other errors """
+        read_file = self.project.editor_methods.get('read_file')
         try:
-            with open(self.filename, 'r', encoding='utf-8') as theFile:
-                full_file_contents = theFile.read()
+            if read_file:
+                full_file_contents = read_file(self.filename)
+            else:
+                with open(self.filename, 'r', encoding='utf-8') as theFile:
+                    full_file_contents = theFile.read()
         except IsADirectoryError:
             return None
         except UnicodeDecodeError:
@@ -40,7 +45,7 @@ class UrtextFile(UrtextBuffer):
         if existing_contents == self.contents:
             return False
         if self.filename:
-            utils.write_file_contents(self.filename, self.contents)
+            self.project.write_file(self.filename, self.contents)
             buffer_setting = self.project.get_single_setting('use_buffer')
             if buffer_setting and buffer_setting.true():
                 self.project.run_editor_method('set_buffer', self.filename, self.contents)
@@ -0,0 +1,378 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+CREATED = 'created'
+MODIFIED = 'modified'
+DELETED = 'deleted'
+MOVED = 'moved'
+DIRECTORY = 'directory'     # a directory was created, deleted or moved
+OVERFLOW = 'overflow'       # events were lost; everything should be checked
+
+class PollingBackend:
+    """
+    Lists each watched directory with os.scandir and compares the
+    entries with the previous listing. Works on any platform.
+    """
+
+    def __init__(self):
+        self.directories = {}   # directory -> {name: (inode, mtime, size, is_dir)}
+
+    def watch(self, directory):
+        if directory not in self.directories:
+            self.directories[directory] = self._list(directory)
+        return True
+
+    def unwatch(self, directory):
+        self.directories.pop(directory, None)
+
+    def read_events(self, timeout):
+        if timeout:
+            time.sleep(timeout)
+        return self.scan()
+
+    def scan(self):
+        created = {}    # inode -> path
+        deleted = {}
+        events = []
+        for directory, entries in list(self.directories.items()):
+            listing = self._list(directory)
+            self.directories[directory] = listing
+            if (listing is None) != (entries is None):
+                events.append((DIRECTORY, directory, None))
+            listing = listing if listing else {}
+            entries = entries if entries else {}
+            for name, entry in entries.items():
+                if name not in listing:
+                    path = os.path.join(directory, name)
+                    if entry[3]:
+                        events.append((DIRECTORY, path, None))
+                    else:
+                        deleted[entry[0]] = path
+            for name, entry in listing.items():
+                path = os.path.join(directory, name)
+                if name not in entries:
+                    if entry[3]:
+                        events.append((DIRECTORY, path, None))
+                    else:
+                        created[entry[0]] = path
+                elif entry != entries[name] and not entry[3]:
+                    events.append((MODIFIED, path, None))
+        for inode, path in deleted.items():
+            if inode in created:
+                events.append((MOVED, path, created.pop(inode)))
+            else:
+                events.append((DELETED, path, None))
+        events.extend((CREATED, path, None) for path in created.values())
+        return events
+
+    def close(self):
+        self.directories = {}
+
+    def _list(self, directory):
+        entries = {}
+        try:
+            with os.scandir(directory) as scan:
+                for entry in scan:
+                    try:
+                        stat = entry.stat()
+                        entries[entry.name] = (
+                            stat.st_ino,
+                            stat.st_mtime_ns,
+                            stat.st_size,
+                            entry.is_dir())
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return entries
+
+class InotifyBackend:
+    """
+    Asks the Linux kernel for changes in the watched directories,
+    so nothing is listed until something changes.
+    """
+
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+        IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}       # watch descriptor -> directory
+        self.directories = {}   # directory -> watch descriptor
+
+    @staticmethod
+    def available():
+        return sys.platform.startswith('linux')
+
+    def watch(self, directory):
+        if directory in self.directories:
+            return True
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            return False
+        self.watches[wd] = directory
+        self.directories[directory] = wd
+        return True
+
+    def unwatch(self, directory):
+        wd = self.directories.pop(directory, None)
+        if wd is not None:
+            self.watches.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        moves = {}      # cookie -> index in events of the move's first half
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+            name = data[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b'\0')
+            offset += self.EVENT.size + length
+            if mask & self.IN_Q_OVERFLOW:
+                events.append((OVERFLOW, None, None))
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if mask & self.IN_IGNORED:
+                del self.watches[wd]
+                self.directories.pop(directory, None)
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            if mask & (self.IN_ISDIR | self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                events.append((DIRECTORY, path, None))
+            elif mask & self.IN_MOVED_FROM:
+                moves[cookie] = len(events)
+                events.append((DELETED, path, None))
+            elif mask & self.IN_MOVED_TO:
+                if cookie in moves:
+                    index = moves.pop(cookie)
+                    events[index] = (MOVED, events[index][1], path)
+                else:
+                    events.append((CREATED, path, None))
+            elif mask & self.IN_CREATE:
+                events.append((CREATED, path, None))
+            elif mask & self.IN_DELETE:
+                events.append((DELETED, path, None))
+            else:
+                events.append((MODIFIED, path, None))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self.watches = {}
+        self.directories = {}
+
+def make_backend():
+    if InotifyBackend.available():
+        try:
+            return InotifyBackend()
+        except (OSError, AttributeError):
+            pass
+    return PollingBackend()
+
+class FileWatcher:
+    """
+    Watches the directories of every project for files changed
+    outside the editor. Changes are gathered until none has come
+    for `delay` seconds, then handed to the projects that include
+    them in one job; a batch still waiting on the executor takes
+    in later ones instead of queuing another job.
+    """
+
+    def __init__(self, project_list, interval=1.0, delay=0.2, backend=None):
+        self.project_list = project_list
+        self.interval = interval    # seconds to wait for a first change
+        self.delay = delay          # quiet seconds that end a batch
+        self.batch_limit = 2.0      # longest a batch keeps gathering changes
+        self.backend = backend if backend else make_backend()
+        self.fallback = None        # polls directories the backend could not watch
+        self.lock = threading.Lock()
+        self.directories = frozenset()  # directories the projects include
+        self.watched = frozenset()
+        self.pending = None         # (filenames, directories, overflow) waiting on the executor
+        self.thread = None
+        self.stopped = threading.Event()
+        self.counts = {
+            'events': 0,
+            'batches': 0,
+            'coalesced': 0,     # batches merged into one already waiting
+        }
+
+    def start(self):
+        """ from the executor, once the projects are loaded """
+        self.set_directories()
+        if self.project_list.is_async and not self.thread:
+            self.thread = threading.Thread(target=self._watch, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.backend.close()
+        if self.fallback:
+            self.fallback.close()
+
+    def is_running(self):
+        return not self.stopped.is_set() and (
+            self.thread is not None or not self.project_list.is_async)
+
+    def set_directories(self):
+        """ from the executor, after the projects' paths may have changed """
+        directories = set(self.project_list._get_project_paths())
+        for project in self.project_list.projects:
+            for path in project.paths:
+                directories.add(path if os.path.isdir(path) else os.path.dirname(path))
+        self.directories = frozenset(directories)
+
+    def check(self):
+        """ without a watching thread, applies changes made since the last check """
+        events = self._update_watches()
+        events.extend(self._read_batch(0))
+        if events:
+            self._dispatch(events)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts)
+            stats['directories'] = len(self.watched)
+            stats['backend'] = type(self.backend).__name__
+            stats['polled'] = len(self.fallback.directories) if self.fallback else 0
+            return stats
+
+    def _watch(self):
+        while not self.stopped.is_set():
+            events = self._update_watches()
+            events.extend(self._read_batch(0 if events else self.interval))
+            if events and not self.stopped.is_set():
+                self._dispatch(events)
+
+    def _update_watches(self):
+        """
+        Files may have arrived in a directory between the project
+        adding it and the watch starting, so the files of directories
+        watched after the first ones come back as changed.
+        """
+        directories = self.directories
+        events = []
+        if directories is self.watched:
+            return events
+        for directory in self.watched - directories:
+            self.backend.unwatch(directory)
+            if self.fallback:
+                self.fallback.unwatch(directory)
+        for directory in directories - self.watched:
+            if not self.backend.watch(directory):
+                if not self.fallback:
+                    self.fallback = PollingBackend()
+                self.fallback.watch(directory)
+            if self.watched:
+                try:
+                    events.extend(
+                        (MODIFIED, os.path.join(directory, name), None)
+                        for name in os.listdir(directory))
+                except OSError:
+                    pass
+        self.watched = directories
+        return events
+
+    def _read_batch(self, timeout):
+        events = self._read(timeout)
+        if not events:
+            return events
+        started = time.time()
+        while time.time() - started < self.batch_limit:
+            more = self._read(self.delay)
+            if not more:
+                break
+            events.extend(more)
+        return events
+
+    def _read(self, timeout):
+        events = self.backend.read_events(timeout)
+        if self.fallback and self.fallback.directories:
+            events.extend(self.fallback.scan())
+        return events
+
+    def _dispatch(self, events):
+        filenames = set()
+        directories = set()
+        overflow = False
+        for kind, path, destination in events:
+            if kind == OVERFLOW:
+                overflow = True
+            elif kind == DIRECTORY:
+                directories.add(path)
+            else:
+                filenames.add(path)
+                if destination:
+                    filenames.add(destination)
+        with self.lock:
+            self.counts['events'] += len(events)
+            self.counts['batches'] += 1
+            if self.pending:
+                self.pending[0].update(filenames)
+                self.pending[1].update(directories)
+                self.pending[2] = self.pending[2] or overflow
+                self.counts['coalesced'] += 1
+                return
+            self.pending = [filenames, directories, overflow]
+        self.project_list.execute(self._apply)
+
+    def _apply(self):
+        if self.project_list.defer_while_initializing(self._apply):
+            # stays pending, so later batches still merge into it
+            return
+        with self.lock:
+            filenames, directories, overflow = self.pending
+            self.pending = None
+        project_paths = self.project_list._get_project_paths()
+        changes = {}    # project -> [filenames, rescan]
+        for project in self.project_list.projects:
+            if overflow:
+                changes[project] = [list(project.files), True]
+        for filename in sorted(filenames):
+            project = project_paths.get(os.path.dirname(filename))
+            if project:
+                changes.setdefault(project, [[], False])[0].append(filename)
+        for directory in directories:
+            for path in [directory, os.path.dirname(directory)]:
+                project = project_paths.get(path)
+                if project:
+                    changes.setdefault(project, [[], False])[1] = True
+        for project, (project_filenames, rescan) in changes.items():
+            project.on_files_changed(project_filenames, rescan=rescan)
+        self.set_directories()
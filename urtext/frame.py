@@ -2,6 +2,7 @@ from urtext.utils import get_id_from_link, get_all_targets_from_string
 import urtext.syntax as syntax
 import traceback
 import datetime
+import time
 
 class UrtextFrame:
 
@@ -21,6 +22,7 @@ class UrtextFrame:
         self.param_string = param_string
         self.system_contents = []
         self.source_node = None  # set by node once compiled
+        self.operation_times = []   # (call name, seconds) of the last run, when the project is timed
         self.init_self(param_string)
         if not self.show:
             self.show = '$_link\n'
@@ -82,11 +84,14 @@ class UrtextFrame:
         self.excluded_nodes = []
         self.project.run_hook('on_frame_process_started', self)
         accumulated_text = ''
+        timed = self.project.timer.enabled
         for operation in self.operations:
             if operation.should_continue() is False:
                 return False
 
             current_text = accumulated_text
+            if timed:
+                start = time.perf_counter()
             try:
                 transformed_text = operation.dynamic_output(current_text)
             except Exception as e:
@@ -97,6 +102,8 @@ class UrtextFrame:
                     traceback.format_exc(),
                     '\n'
                 ]) + '`'
+            if timed:
+                self.operation_times.append((operation.name[0], time.perf_counter() - start))
             if transformed_text is False:  # not None
                 return ''
             if transformed_text is None:
@@ -114,9 +121,12 @@ class UrtextFrame:
         return accumulated_text
 
     def default_output(self):
+        timed = self.project.timer.enabled
         for operation in list(reversed(self.operations)):
             if operation.should_continue() is False:
                 return '%s specifies no text' % operation.name[0]
+            if timed:
+                start = time.perf_counter()
             try:
                 transformed_text = operation.default_output()
             except Exception as e:
@@ -128,6 +138,9 @@ class UrtextFrame:
                     '\n'
                 ]) + '`'
                 continue
+            finally:
+                if timed:
+                    self.operation_times.append((operation.name[0], time.perf_counter() - start))
             if transformed_text is None:
                 continue
             if transformed_text is False:
@@ -164,6 +177,7 @@ class UrtextFrame:
         if flags is None:
             flags = []
         self.flags = flags       
+        self.operation_times = []
         output = self.process_output()
         self.ran = True
         return output
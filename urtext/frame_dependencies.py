@@ -0,0 +1,133 @@
+class FrameDependencies:
+    """
+    Records what each frame read from the project on its last run
+    and which of those inputs have changed since, so that only
+    frames whose inputs changed need to run again.
+
+    Inputs are tuples:
+        ('node', id)      a node's contents, title, links or metadata
+        ('nodes',)        which node ids exist
+        ('meta', key)     any node's values for key; key '*' for any key
+        ('links_to', id)  which nodes link to id
+        ('contents',)     any node's contents
+        ('settings',)     any project_settings node
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.version = 0
+        self.versions = {}          # input -> version at which it last changed
+        self.frame_inputs = {}      # frame key -> inputs read on its last run
+        self.frame_versions = {}    # frame key -> version of its last run
+        self.frame_outputs = {}     # frame key -> output of its last run
+        self.fingerprints = {}      # node id -> (contents, title, links) when last settled
+        self.pending_nodes = set()
+        self.recording = None
+
+    def read(self, *inputs):
+        if self.recording is not None:
+            self.recording.update(inputs)
+
+    def changed(self, *inputs):
+        self.version += 1
+        for i in inputs:
+            self.versions[i] = self.version
+
+    def node_changed(self, node_id):
+        self.pending_nodes.add(node_id)
+
+    def metadata_changed(self, node_id, keys):
+        self.changed(('node', node_id), ('meta', '*'), *[('meta', k) for k in keys])
+
+    def start(self, frame):
+        self._settle()
+        self.recording = set()
+
+    def finish(self, frame, output):
+        self.recording.update([('node', n.id) for n in frame.included_nodes])
+        key = frame_key(frame)
+        self.frame_inputs[key] = self.recording
+        self.frame_versions[key] = self.version
+        self.frame_outputs[key] = output
+        self.recording = None
+
+    def is_tracked(self, frame):
+        """ frames with calls that read the project in untracked ways always run """
+        return all(op.tracks_reads for op in frame.operations)
+
+    def is_stale(self, frame):
+        self._settle()
+        key = frame_key(frame)
+        if not self.is_tracked(frame) or key not in self.frame_versions:
+            return True
+        version = self.frame_versions[key]
+        if self.versions.get(('settings',), 0) > version:
+            return True
+        for i in self.frame_inputs[key]:
+            if self.versions.get(i, 0) > version:
+                return True
+        return False
+
+    def last_output(self, frame):
+        return self.frame_outputs.get(frame_key(frame))
+
+    def order(self, frames):
+        """
+        Orders frames so that a frame whose targets another frame
+        reads runs before it. Frames in a cycle keep their given order.
+        """
+        produces = {}
+        for frame in frames:
+            produces[frame] = set()
+            for target_id in frame.target_ids():
+                produces[frame].add(('node', target_id))
+                target = self.project.nodes.get(target_id)
+                if target:
+                    produces[frame].update([('meta', k) for k in target.metadata.entries_dict])
+                    produces[frame].update([('links_to', l) for l in target.links_ids()])
+            if produces[frame]:
+                produces[frame].update([('meta', '*'), ('contents',)])
+        waiting_on = {}
+        for frame in frames:
+            reads = self.frame_inputs.get(frame_key(frame), set())
+            waiting_on[frame] = set([
+                other for other in frames
+                if other is not frame and produces[other] & reads])
+        ordered = []
+        remaining = list(frames)
+        while remaining:
+            ready = [f for f in remaining if not waiting_on[f] - set(ordered)]
+            if not ready:
+                ready = remaining[:1]
+            for frame in ready:
+                ordered.append(frame)
+                remaining.remove(frame)
+        return ordered
+
+    def _settle(self):
+        self.project.metadata_index._refresh()
+        pending_nodes = self.pending_nodes
+        self.pending_nodes = set()
+        for node_id in pending_nodes:
+            node = self.project.nodes.get(node_id)
+            old = self.fingerprints.pop(node_id, None)
+            new = None
+            if node:
+                new = (node.full_contents, node.title, tuple(node.links_ids()))
+                self.fingerprints[node_id] = new
+            if old == new:
+                continue
+            changes = [('node', node_id), ('contents',)]
+            if old is None or new is None:
+                changes.append(('nodes',))
+            old_links = set(old[2]) if old else set()
+            new_links = set(new[2]) if new else set()
+            changes.extend([('links_to', l) for l in old_links ^ new_links])
+            if node_id in self.project.project_settings_nodes or (
+                    node and node.title == 'project_settings') or (
+                    old and old[1] == 'project_settings'):
+                changes.append(('settings',))
+            self.changed(*changes)
+
+def frame_key(frame):
+    return (frame.source_node.id, frame.param_string)
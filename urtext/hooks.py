@@ -0,0 +1,65 @@
+class HookRegistry:
+    """
+    Keeps, for each hook name, the methods of registered objects that
+    implement it, so running a hook only touches its subscribers.
+    Objects are registered under a key in one of the groups given at
+    creation; subscribers run group by group, and within a group in
+    the order their keys were first set.
+    """
+
+    def __init__(self, *groups):
+        self.groups = {group: {} for group in groups}  # group -> {key: objects}
+        self.subscribers = {}   # hook name -> {group: {key: methods}}, built on first use
+        self.counts = {}        # hook name -> times run
+        self.times = {}         # hook name -> seconds spent running it
+
+    def set(self, group, key, objects):
+        self.groups[group][key] = list(objects)
+        for hook_name, subscribers in self.subscribers.items():
+            methods = self._methods(objects, hook_name)
+            if methods:
+                subscribers[group][key] = methods
+            else:
+                subscribers[group].pop(key, None)
+
+    def remove(self, group, key):
+        if key in self.groups[group]:
+            del self.groups[group][key]
+            for subscribers in self.subscribers.values():
+                subscribers[group].pop(key, None)
+
+    def get(self, hook_name, *groups):
+        """ methods implementing hook_name in the given groups (default all), in order """
+        if hook_name not in self.subscribers:
+            self.subscribers[hook_name] = {}
+            for group, entries in self.groups.items():
+                self.subscribers[hook_name][group] = {}
+                for key, objects in entries.items():
+                    methods = self._methods(objects, hook_name)
+                    if methods:
+                        self.subscribers[hook_name][group][key] = methods
+        methods = []
+        for group in groups or self.groups:
+            for key_methods in self.subscribers[hook_name][group].values():
+                methods.extend(key_methods)
+        return methods
+
+    def record(self, hook_name, seconds):
+        self.counts[hook_name] = self.counts.get(hook_name, 0) + 1
+        self.times[hook_name] = self.times.get(hook_name, 0) + seconds
+
+    def stats(self):
+        """ {hook name: {'count', 'time', 'subscribers'}} for hooks run so far """
+        return {hook_name: {
+                'count': self.counts[hook_name],
+                'time': self.times[hook_name],
+                'subscribers': len(self.get(hook_name)),
+            } for hook_name in self.counts}
+
+    def _methods(self, objects, hook_name):
+        methods = []
+        for obj in objects:
+            hook = getattr(obj, hook_name, None)
+            if hook and callable(hook):
+                methods.append(hook)
+        return methods
@@ -4,6 +4,31 @@ import os
 
 class UrtextLink:
 
+	__slots__ = (
+		'containing_node',
+		'matching_string',
+		'filename',
+		'project_list',
+		'bound',
+		'bound_argument',
+		'project_name',
+		'is_http',
+		'is_node',
+		'node_id',
+		'is_pointer',
+		'is_file',
+		'is_action',
+		'is_missing',
+		'position_in_string',
+		'dest_node_position',
+		'character_number',
+		'line_number',
+		'suffix',
+		'dest_file_line',
+		'url',
+		'path',
+		)
+
 	def __init__(self, matching_string, node, project_list):
 		self.containing_node = node
 		self.matching_string = matching_string
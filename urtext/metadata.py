@@ -5,6 +5,8 @@ import urtext.utils as utils
 
 class NodeMetadata:
 
+    __slots__ = ('node', 'entries_dict', 'project')
+
     def __init__(self, 
         node,
         project):
@@ -172,6 +174,7 @@ class NodeMetadata:
 
         self.entries_dict[key] = self.entries_dict.get(key, [])        
         self.entries_dict[key].append(e)
+        self._changed()
 
     def get_keys(self, exclude=[]):
         keys = {}
@@ -296,9 +299,23 @@ class NodeMetadata:
       
     def clear_from_source(self, source_node):
         for k in self.entries_dict:
-            for entry in self.entries_dict[k]:
-                if entry.from_node == source_node:
-                    self.entries_dict[k].remove(entry)
+            self.entries_dict[k] = [
+                e for e in self.entries_dict[k] if e.from_node != source_node]
+        self._changed()
+
+    def clear_inherited_entries(self):
+        for k in list(self.entries_dict):
+            self.entries_dict[k] = [
+                e for e in self.entries_dict[k] if e.from_node in [None, self.node]]
+            if not self.entries_dict[k]:
+                del self.entries_dict[k]
+        self._changed()
+
+    def _changed(self):
+        if self.project.metadata_index:
+            self.project.metadata_index.mark(self.node)
+            if self.node.title == 'project_settings':
+                self.project.project_list.settings_changed()
     
     def convert_hash_keys(self):
         hash_key_setting = self.project.get_single_setting('hash_key')
@@ -310,6 +327,7 @@ class NodeMetadata:
                 self.entries_dict.setdefault(hash_key_setting, [])                
                 self.entries_dict[hash_key_setting].extend(self.entries_dict['#'])
                 del self.entries_dict['#']
+                self._changed()
 
     def get_oldest_timestamp(self):
         value = self.get_first_value('_oldest_timestamp')
@@ -2,9 +2,22 @@ from urtext.metadata_value import MetadataValue
 import urtext.syntax as syntax
 import urtext.utils as utils
 import re
+import sys
 
 class MetadataEntry:  # container for a single metadata entry
 
+    __slots__ = (
+        'node',
+        'keyname',
+        'tag_self',
+        'tag_children',
+        'tag_descendants',
+        'from_node',
+        'start_position',
+        'end_position',
+        'meta_values',
+        )
+
     def __init__(self, 
         keyname, 
         values,
@@ -17,7 +30,7 @@ class MetadataEntry:  # container for a single metadata entry
         from_node=None):
 
         self.node = node
-        self.keyname = keyname
+        self.keyname = sys.intern(keyname)
         self.tag_self = tag_self
         self.tag_children = tag_children
         self.tag_descendants = tag_descendants
@@ -26,7 +39,7 @@ class MetadataEntry:  # container for a single metadata entry
         self.end_position = end_position
         self.meta_values = []
         for v in values:
-            value = MetadataValue(self.node.project)
+            value = MetadataValue()
             if isinstance(v, str):
                 value.set_from_text(v)
             else:
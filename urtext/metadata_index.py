@@ -0,0 +1,199 @@
+import bisect
+from urtext.timestamp import default_date
+
+class MetadataIndex:
+    """
+    Project-wide inverted index of node metadata. Nodes whose
+    metadata changed are re-indexed the next time the index is read.
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.key_counts = {}        # key -> {node id: number of entries}
+        self.nodes_with_values = {} # key -> {node id: number of values}
+        self.values = {}            # key -> {text: {node id: number of values}}
+        self.lower_values = {}      # key -> {lowercased text: {node id: number of values}}
+        self.dates = {}             # key -> ([dates, ascending], [node ids]), built on first use
+        self.node_dates = {}        # key -> {node id: date}
+        self.indexed = {}           # node -> (node id, what it contributed)
+        self.changed = set()
+        self.listeners = []         # told which keys of which nodes changed
+
+    def mark(self, node):
+        if node in self.indexed or self.project.nodes.get(node.id) is node:
+            self.changed.add(node)
+
+    def get_keys_with_frequency(self):
+        self._refresh()
+        return {k: sum(self.key_counts[k].values()) for k in self.key_counts}
+
+    def get_values_with_frequency(self, key):
+        self._refresh()
+        values = self.values.get(key.lower(), {})
+        return {text: sum(values[text].values()) for text in values}
+
+    def get_nodes_with_values(self, key):
+        self._refresh()
+        return list(self.nodes_with_values.get(key.lower(), []))
+
+    def get_nodes_with_value(self, key, value, case_sensitive=False):
+        self._refresh()
+        if case_sensitive:
+            return list(self.values.get(key.lower(), {}).get(value, []))
+        return list(self.lower_values.get(key.lower(), {}).get(value.lower(), []))
+
+    def get_values(self, key):
+        """ distinct value texts for key, as they were entered """
+        self._refresh()
+        return list(self.values.get(key.lower(), {}))
+
+    def get_dates(self, key):
+        """
+        Returns parallel lists (dates, node ids) in date order
+        for nodes with a timestamp as their first value for key.
+        """
+        self._refresh()
+        key = key.lower()
+        if key not in self.dates:
+            self.dates[key] = ([], [])
+            self.node_dates[key] = {}
+            for node_id in self.nodes_with_values.get(key, []):
+                self._add_date(key, self.project.nodes[node_id])
+        return self.dates[key]
+
+    def get_nodes_before(self, key, date):
+        dates, node_ids = self.get_dates(key)
+        return self._slice_dates(dates, node_ids, 0, bisect.bisect_left(dates, date))
+
+    def get_nodes_after(self, key, date):
+        dates, node_ids = self.get_dates(key)
+        return self._slice_dates(dates, node_ids, bisect.bisect_right(dates, date), len(dates))
+
+    def _slice_dates(self, dates, node_ids, start, end):
+        # unparseable timestamps carry the default date; leave them out
+        low = bisect.bisect_left(dates, default_date)
+        high = bisect.bisect_right(dates, default_date)
+        return node_ids[start:min(end, low)] + node_ids[max(start, high):end]
+
+    def _add_date(self, key, node):
+        value = node.metadata.get_first_value(key)
+        if not value or not value.timestamp:
+            return
+        date = value.timestamp.datetime
+        dates, node_ids = self.dates[key]
+        index = bisect.bisect_right(dates, date)
+        dates.insert(index, date)
+        node_ids.insert(index, node.id)
+        self.node_dates[key][node.id] = date
+
+    def _remove_date(self, key, node_id):
+        date = self.node_dates[key].pop(node_id, None)
+        if date is None:
+            return
+        dates, node_ids = self.dates[key]
+        index = bisect.bisect_left(dates, date)
+        while node_ids[index] != node_id:
+            index += 1
+        del dates[index]
+        del node_ids[index]
+
+    def _refresh(self):
+        changed = list(self.changed)
+        self.changed.clear()
+        removed = {}
+        added = {}
+        # a dropped node and its replacement can share an id
+        for node in changed:
+            if node in self.indexed:
+                node_id, key_counts, value_counts = self.indexed[node]
+                removed[node_id] = (key_counts, value_counts)
+                self._remove(node)
+        for node in changed:
+            if self.project.nodes.get(node.id) is node:
+                self._add(node)
+                added[node.id] = self.indexed[node][1:]
+        if self.listeners:
+            for node_id in set(removed) | set(added):
+                old_keys, old_values = removed.get(node_id, ({}, {}))
+                new_keys, new_values = added.get(node_id, ({}, {}))
+                keys = [k for k in set(old_keys) | set(new_keys) | set(old_values) | set(new_values)
+                    if old_keys.get(k) != new_keys.get(k) or old_values.get(k) != new_values.get(k)]
+                if keys:
+                    for listener in self.listeners:
+                        listener.metadata_changed(node_id, keys)
+
+    def _add(self, node):
+        key_counts = {}
+        value_counts = {}
+        for k, entries in node.metadata.entries_dict.items():
+            if entries:
+                key_counts[k] = len(entries)
+            for entry in entries:
+                if not entry.tag_self:
+                    continue
+                for v in entry.meta_values:
+                    value_counts.setdefault(k, {})
+                    value_counts[k][v.text] = value_counts[k].get(v.text, 0) + 1
+
+        for k in key_counts:
+            self.key_counts.setdefault(k, {})[node.id] = key_counts[k]
+        for k in value_counts:
+            self.nodes_with_values.setdefault(k, {})[node.id] = sum(value_counts[k].values())
+            for text in value_counts[k]:
+                if not text:
+                    continue
+                self._increment(self.values, k, text, node.id, value_counts[k][text])
+                self._increment(self.lower_values, k, text.lower(), node.id, value_counts[k][text])
+            if k in self.dates:
+                self._add_date(k, node)
+        self.indexed[node] = (node.id, key_counts, value_counts)
+
+    def _remove(self, node):
+        node_id, key_counts, value_counts = self.indexed.pop(node)
+        for k in key_counts:
+            self._discard(self.key_counts, k, node_id)
+        for k in value_counts:
+            self._discard(self.nodes_with_values, k, node_id)
+            for text in value_counts[k]:
+                if not text:
+                    continue
+                self._decrement(self.values, k, text, node_id, value_counts[k][text])
+                self._decrement(self.lower_values, k, text.lower(), node_id, value_counts[k][text])
+            if k in self.dates:
+                self._remove_date(k, node_id)
+
+    def _increment(self, table, key, value, node_id, count):
+        nodes = table.setdefault(key, {}).setdefault(value, {})
+        nodes[node_id] = nodes.get(node_id, 0) + count
+
+    def _decrement(self, table, key, value, node_id, count):
+        nodes = table[key][value]
+        nodes[node_id] -= count
+        if not nodes[node_id]:
+            del nodes[node_id]
+            if not nodes:
+                del table[key][value]
+                if not table[key]:
+                    del table[key]
+
+    def _discard(self, table, key, node_id):
+        del table[key][node_id]
+        if not table[key]:
+            del table[key]
+
+    def is_consistent(self):
+        """ compares the index against one built from scratch """
+        self._refresh()
+        rebuilt = MetadataIndex(self.project)
+        for key in self.dates:
+            rebuilt.dates[key] = ([], [])
+            rebuilt.node_dates[key] = {}
+        for node in self.project.nodes.values():
+            rebuilt._add(node)
+        return (
+            rebuilt.node_dates == self.node_dates and
+            all(sorted(zip(*rebuilt.dates[k])) == sorted(zip(*self.dates[k])) for k in self.dates) and
+            rebuilt.key_counts == self.key_counts and
+            rebuilt.nodes_with_values == self.nodes_with_values and
+            rebuilt.values == self.values and
+            rebuilt.lower_values == self.lower_values)
@@ -2,12 +2,22 @@ from urtext.timestamp import UrtextTimestamp
 import urtext.syntax as syntax
 import urtext.utils as utils
 import os
+import sys
 
 class MetadataValue:
 
-    def __init__(self, project):
+    __slots__ = (
+        'timestamp',
+        'node_as_value',
+        'text_lower',
+        'text',
+        'unparsed_text',
+        'entry',
+        )
+
+    def __init__(self):
         self.timestamp = None
-        self.project = project
+        self.entry = None
         self.node_as_value = False
         self.text_lower = None
         self.text = None
@@ -26,8 +36,12 @@ class MetadataValue:
                 start_position=ts.start())
             if t.datetime:
                 self.timestamp = t
-        self.text = value_string
-        self.text_lower = value_string.lower()
+        self.text = sys.intern(value_string)
+        self.text_lower = sys.intern(value_string.lower())
+
+    @property
+    def project(self):
+        return self.entry.node.project
 
     def num(self):
         try:
@@ -1,12 +1,59 @@
 import re
+import sys
 from urtext.metadata import NodeMetadata
 from urtext.frame import UrtextFrame
 import urtext.utils as utils
 import urtext.syntax as syntax
 
+no_export_points = {}  # shared by nodes without export points; never modified
+
 class UrtextNode:
 
     urtext_metadata = NodeMetadata
+    # Fields most nodes leave empty start as shared empty values and
+    # are replaced, not modified, when set. __dict__ takes any other
+    # attribute a call or an editor adds.
+    __slots__ = (
+        'project',
+        'ranges',
+        'is_tree',
+        'is_node',
+        'is_meta',
+        'meta_key',
+        'export_points',
+        'marked_dynamic',
+        'is_dynamic',
+        'id',
+        'has_errors',
+        'pointers',
+        'display_detail',
+        'links',
+        'root_node',
+        'compact',
+        'frames',
+        'target_nodes',
+        'untitled',
+        'title_only',
+        'title',
+        'parent',
+        'children',
+        'first_line_title',
+        'title_from_marker',
+        'nested',
+        'resolution',
+        'filename',
+        'embedded_syntax_ranges',
+        'frame_ranges',
+        'full_contents',
+        'metadata',
+        'stripped_contents',
+        'text',
+        'buffer',
+        'file',
+        'start_position',
+        'end_position',
+        '__dict__',
+        )
 
     def __init__(self, 
         contents,
@@ -21,18 +68,18 @@ class UrtextNode:
         self.is_node = True
         self.is_meta = False
         self.meta_key = None
-        self.export_points = {}
+        self.export_points = no_export_points
         self.marked_dynamic = False
         self.is_dynamic = False
         self.id = None
         self.has_errors = False
-        self.pointers = []
+        self.pointers = ()
         self.display_detail = ''
         self.links = []
         self.root_node = root
         self.compact = compact
-        self.frames = []
-        self.target_nodes = []
+        self.frames = ()
+        self.target_nodes = ()
         self.untitled = False
         self.title_only = False
         self.title = ''
@@ -43,22 +90,24 @@ class UrtextNode:
         self.nested = nested
         self.resolution = None
         self.filename = None
-        self.embedded_syntax_ranges = []
-        self.frame_ranges = []
+        self.embedded_syntax_ranges = ()
+        self.frame_ranges = ()
         
         contents = utils.strip_errors(contents)
 
         ranges, stripped_contents = utils.strip_backtick_escape(contents)
-        self.embedded_syntax_ranges.extend(ranges)
         stripped_contents = utils.strip_whitespace_anchors(stripped_contents)
         self.full_contents = stripped_contents
 
-        ranges, stripped_contents, replaced_contents = self._strip_embedded_syntaxes(stripped_contents)
-        self.embedded_syntax_ranges.extend(ranges)
+        embedded_ranges, stripped_contents, replaced_contents = self._strip_embedded_syntaxes(stripped_contents)
+        if ranges or embedded_ranges:
+            self.embedded_syntax_ranges = ranges + embedded_ranges
 
         replaced_contents, self.marked_dynamic = check_and_sanitize_dynamic_marker(replaced_contents)
         self._get_links(replaced_contents)
-        self.frame_ranges, stripped_contents, replaced_contents = self.parse_frames(replaced_contents)
+        frame_ranges, stripped_contents, replaced_contents = self.parse_frames(replaced_contents)
+        if frame_ranges:
+            self.frame_ranges = frame_ranges
         self.metadata = self.urtext_metadata(self, self.project)        
         stripped_contents, replaced_contents = self.metadata.parse_contents(replaced_contents)
         for link in self.links:
@@ -66,7 +115,7 @@ class UrtextNode:
         self.title = self.set_title(stripped_contents)
         if not stripped_contents.strip().replace(self.title,'').replace(' _',''):
             self.title_only = True
-        self.id = self.title
+        self.id = self.title = sys.intern(self.title)
         for d in self.frames:
             d.source_node = self
         for entry in self.metadata.entries():
@@ -300,12 +349,7 @@ class UrtextNode:
                 ])
         else:
             new_node_contents = new_contents
-        file_contents = self.file._get_contents()
-        new_file_contents = ''.join([
-            file_contents[:self.start_position],
-            new_node_contents,
-            file_contents[self.end_position:]])
-        self.file.set_buffer_contents(new_file_contents, clear_messages=False)
+        self.file.set_node_contents(self, new_node_contents)
         # does not re-parse into project
 
     def replace_range(self, 
@@ -327,12 +371,13 @@ class UrtextNode:
 
     def parse_frames(self, contents): 
         frame_ranges = []
+        frames = []
         stripped_contents = contents
         replaced_contents = contents
         for d in syntax.dynamic_def_c.finditer(contents):
             frame_ranges.append([d.start(),d.end()])
             param_string = d.group(0)[2:-2]
-            self.frames.append(
+            frames.append(
                 UrtextFrame(
                     param_string, 
                     self.project, 
@@ -346,6 +391,8 @@ class UrtextNode:
                 d.group(), 
                 '', 
                 1)
+        if frames:
+            self.frames = frames
 
         return frame_ranges, stripped_contents, replaced_contents
 
@@ -0,0 +1,57 @@
+import concurrent.futures
+from itertools import repeat
+from urtext.parse_cache import dump_buffer
+
+# below this many files the pool startup costs more than it saves
+min_files_for_parallel_parse = 100
+
+class ParseContext:
+    """
+    Stands in for the project while a file is parsed in a worker
+    process. Parsing only needs the project for logging; frames are
+    rebuilt against the real project when the buffer is loaded.
+    """
+    compiled = False
+    project_list = None
+    metadata_index = None
+    batched_edits = None
+    editor_methods = {}
+
+    def __init__(self):
+        self.nodes = {}
+        self.logged_messages = []
+
+    def log_item(self, filename, message):
+        self.logged_messages.append((filename, message))
+
+    def get_call(self, call_name):
+        return None
+
+    def get_single_setting(self, setting, **kwargs):
+        return None
+
+    def setting_is_true(self, setting):
+        return False
+
+    def run_editor_method(self, method_name, *args, **kwargs):
+        return False
+
+def parse_file_in_worker(filename, urtext_file):
+    context = ParseContext()
+    buffer = urtext_file(filename, context)
+    return filename, dump_buffer(buffer, context), context.logged_messages
+
+def parse_files(filenames, urtext_file, workers):
+    """
+    Parses files in a process pool. Returns {filename: (pickled buffer, logged messages)}.
+    """
+    results = {}
+    chunksize = max(1, len(filenames) // (workers * 4))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for filename, data, messages in executor.map(
+                parse_file_in_worker,
+                filenames,
+                repeat(urtext_file),
+                chunksize=chunksize):
+            results[filename] = (data, messages)
+    return results
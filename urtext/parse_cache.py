@@ -0,0 +1,220 @@
+import os
+import re
+import io
+import pickle
+import hashlib
+import importlib
+import sys
+from urtext.frame import UrtextFrame
+
+# bump when the pickling below changes
+CACHE_FORMAT_VERSION = 3
+
+# modules whose objects are in cached buffers, or that decide how
+# files parse; a change to any of them invalidates the cache
+pickled_modules = [
+    'urtext.syntax',
+    'urtext.utils',
+    'urtext.buffer',
+    'urtext.file',
+    'urtext.node',
+    'urtext.frame',
+    'urtext.metadata',
+    'urtext.metadata_entry',
+    'urtext.metadata_value',
+    'urtext.link',
+    'urtext.target',
+    'urtext.timestamp',
+    ]
+
+re_match_type = type(re.match('', ''))
+
+def source_fingerprint():
+    fingerprint = hashlib.sha1()
+    for module_name in pickled_modules:
+        module = importlib.import_module(module_name)
+        try:
+            with open(module.__file__, 'rb') as f:
+                source = f.read()
+        except (OSError, TypeError):
+            source = repr(sorted(
+                (k, repr(v)) for k, v in vars(module).items()
+                if isinstance(v, (str, tuple, type)))).encode('utf-8')
+        fingerprint.update(module_name.encode('utf-8'))
+        fingerprint.update(hashlib.sha1(source).digest())
+    return fingerprint.hexdigest()
+
+cache_version = '%s-%s' % (CACHE_FORMAT_VERSION, source_fingerprint())
+
+def contents_hash(contents):
+    return hashlib.sha1(contents.encode('utf-8')).hexdigest()
+
+class BufferPickler(pickle.Pickler):
+    """
+    Pickles a parsed buffer without the project, project list,
+    frames (kept as their param strings) or regex matches.
+    """
+
+    def __init__(self, file, project):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.project = project
+        self.project_list = getattr(project, 'project_list', None)
+
+    def persistent_id(self, obj):
+        if obj is self.project:
+            return ('project',)
+        if self.project_list is not None and obj is self.project_list:
+            return ('project_list',)
+        if isinstance(obj, UrtextFrame):
+            return ('frame', obj.param_string, obj.position, obj.end_position)
+        if isinstance(obj, re_match_type):
+            return ('match', obj.re, obj.string, obj.start())
+        return None
+
+class BufferUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, project):
+        super().__init__(file)
+        self.project = project
+
+    def persistent_load(self, pid):
+        kind = pid[0]
+        if kind == 'project':
+            return self.project
+        if kind == 'project_list':
+            return self.project.project_list
+        if kind == 'frame':
+            return UrtextFrame(pid[1], self.project, pid[2], pid[3])
+        if kind == 'match':
+            return pid[1].match(pid[2], pid[3])
+        raise pickle.UnpicklingError('unknown persistent id %s' % kind)
+
+def dump_buffer(buffer, project):
+    f = io.BytesIO()
+    BufferPickler(f, project).dump(buffer)
+    return f.getvalue()
+
+def load_buffer(data, project):
+    buffer = BufferUnpickler(io.BytesIO(data), project).load()
+    for node in buffer.nodes:
+        for frame in node.frames:
+            frame.source_node = node
+        _intern_strings(node)
+    return buffer
+
+def _intern_strings(node):
+    """ unpickled strings are copies; share them with other files' as parsing does """
+    node.title = sys.intern(node.title)
+    if node.id == node.title:
+        node.id = node.title
+    for entry in node.metadata.entries():
+        entry.keyname = sys.intern(entry.keyname)
+        for value in entry.meta_values:
+            if value.text is not None:
+                value.text = sys.intern(value.text)
+                value.text_lower = sys.intern(value.text_lower)
+    for link in node.links:
+        if link.node_id:
+            link.node_id = sys.intern(link.node_id)
+
+class UrtextParseCache:
+    """
+    On-disk cache of parsed files, one entry per file,
+    keyed by path, mtime, size and the hash of the contents parsed.
+    """
+
+    def __init__(self, project, location):
+        self.project = project
+        self.location = os.path.join(
+            location,
+            hashlib.sha1(os.path.abspath(project.entry_point).encode('utf-8')).hexdigest())
+        self.hits = 0
+        self.misses = 0
+        self.pending_keys = {}
+
+    def get(self, filename):
+        key = self._file_key(filename)
+        if not key:
+            return None
+        self.pending_keys[filename] = key
+        entry = self._read_entry(filename)
+        if entry and (
+            entry['version'] == cache_version and
+            entry['filename'] == filename and
+            entry['key'] == key):
+            try:
+                buffer = load_buffer(entry['buffer'], self.project)
+            except Exception:
+                buffer = None
+            if buffer:
+                self.hits += 1
+                return buffer
+        self.misses += 1
+
+    def put(self, filename, buffer, data=None):
+        key = self.pending_keys.pop(filename, None)
+        if not key:
+            return False
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return False
+        if key[:2] != (stat.st_mtime_ns, stat.st_size):
+            return False
+        if buffer.has_errors or buffer.messages or not buffer.root_node or buffer.contents is None:
+            return False
+        # the contents parsed, which may not be those read for the key
+        # if the file was written in between
+        key = key[:2] + (contents_hash(buffer.contents),)
+        try:
+            if data is None:
+                data = dump_buffer(buffer, self.project)
+            entry = pickle.dumps({
+                'version': cache_version,
+                'filename': filename,
+                'key': key,
+                'buffer': data,
+                }, protocol=pickle.HIGHEST_PROTOCOL)
+            os.makedirs(self.location, exist_ok=True)
+            entry_path = self._entry_path(filename)
+            temp_path = entry_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(entry)
+            os.replace(temp_path, entry_path)
+        except Exception:
+            return False
+        return True
+
+    def prune(self, filenames):
+        if not os.path.isdir(self.location):
+            return
+        keep = set(os.path.basename(self._entry_path(f)) for f in filenames)
+        for f in os.listdir(self.location):
+            if f not in keep:
+                try:
+                    os.remove(os.path.join(self.location, f))
+                except OSError:
+                    pass
+
+    def _entry_path(self, filename):
+        return os.path.join(
+            self.location,
+            hashlib.sha1(filename.encode('utf-8')).hexdigest() + '.pickle')
+
+    def _read_entry(self, filename):
+        try:
+            with open(self._entry_path(filename), 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _file_key(self, filename):
+        try:
+            stat = os.stat(filename)
+            # read as UrtextFile reads it, so the hash compares with
+            # that of the contents parsed
+            with open(filename, 'r', encoding='utf-8') as f:
+                contents = f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+        return (stat.st_mtime_ns, stat.st_size, contents_hash(contents))
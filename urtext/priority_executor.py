@@ -0,0 +1,73 @@
+import concurrent.futures
+import heapq
+import itertools
+import threading
+
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+class PriorityExecutor:
+    """
+    Runs submitted functions one at a time on a single worker thread,
+    lowest priority number first and in submission order within a
+    priority. A long job can call run_waiting() between steps to run
+    more urgent jobs on the same thread, so there is still only one
+    thread changing project state.
+    """
+
+    def __init__(self):
+        self.queue = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.running = []       # priorities of the jobs on the worker, innermost last
+        self.thread = threading.Thread(target=self._work, daemon=True)
+        self.thread.start()
+
+    def submit(self, function, *args, priority=NORMAL, **kwargs):
+        future = concurrent.futures.Future()
+        with self.condition:
+            heapq.heappush(self.queue, (
+                priority, next(self.counter), future, function, args, kwargs))
+            self.condition.notify()
+        return future
+
+    def has_waiting(self, below=None):
+        """
+        from a job on the worker, whether a more urgent job is queued;
+        with below, only one more urgent than that priority counts
+        """
+        if threading.current_thread() is not self.thread or not self.running:
+            return False
+        priority = self.running[-1] if below is None else min(below, self.running[-1])
+        with self.condition:
+            return bool(self.queue) and self.queue[0][0] < priority
+
+    def run_waiting(self, below=None):
+        """ from a job on the worker, runs queued jobs more urgent than it (and than below) """
+        while self.has_waiting(below=below):
+            with self.condition:
+                job = heapq.heappop(self.queue)
+            self._run(job)
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+                job = heapq.heappop(self.queue)
+            self._run(job)
+
+    def _run(self, job):
+        priority, _, future, function, args, kwargs = job
+        if not future.set_running_or_notify_cancel():
+            return
+        self.running.append(priority)
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            self.running.pop()
@@ -13,6 +13,15 @@ import urtext.syntax as syntax
 import urtext.utils as utils
 from urtext.exec import Exec
 from urtext.selector import UrtextSelector
+from urtext.parse_cache import UrtextParseCache, load_buffer
+from urtext.metadata_index import MetadataIndex
+from urtext.search_index import SearchIndex
+from urtext.frame_dependencies import FrameDependencies, frame_key
+from urtext.priority_executor import INTERACTIVE, NORMAL
+from urtext.project_snapshot import ProjectSnapshot, SnapshotWriter
+from urtext.hooks import HookRegistry
+import urtext.parallel_parse as parallel_parse
+from urtext.timing import Timer, FrameStats, timed
 from itertools import chain
 
 class UrtextProject:
@@ -38,6 +47,19 @@ class UrtextProject:
         self.time = time.time()
         self.last_compile_time = 0
         self.nodes = {}
+        self.links_to = {}
+        self.nodes_by_title = {}        # title -> ids of nodes with that title
+        self.nodes_by_filename = {}     # filename -> ids of its nodes
+        self.nodes_by_resolution = {}   # resolution -> ids of nodes resolved with it
+        self._node_order = {}
+        self._next_node_order = 0
+        self.metadata_index = MetadataIndex(self)
+        self.search_index = SearchIndex(self)
+        self.frame_dependencies = FrameDependencies(self)
+        self.snapshot = ProjectSnapshot()
+        self.snapshot_writer = SnapshotWriter(self)
+        self.metadata_index.listeners = [self.frame_dependencies, self.snapshot_writer]
+        self.batched_edits = None   # buffers holding deferred frame output while compiling
         self.project_settings_nodes = []
         self.files = {}
         self.buffers = {}
@@ -45,6 +67,7 @@ class UrtextProject:
         self.paths = []
         self.frames = {}
         self.selectors = {}
+        self.hooks = HookRegistry('frames', 'calls', 'selectors')
         self.messages = {}
         self.virtual_outputs = {}
         self.dynamic_metadata_entries = []
@@ -57,11 +80,42 @@ class UrtextProject:
         self.new_file_node_created = new_file_node_created
         self.initial_project = initial
         self.visible = None
+        self.parse_cache = None
+        self._settings_cache = {}
+        self._settings_version = None
+        self._settings_paths = ()
+        self._walked_paths = {}     # path -> (directories under it, {directory: mtime})
+        self._synced_paths = None   # (settings version, settings paths) at the last file list sync
+        self.timer = Timer(enabled=project_list.profile if project_list else False)
+        self.frame_stats = FrameStats()     # kept while the timer is on
+
+    def _cached_setting(self, key, resolve):
+        """
+        Settings are resolved once and kept until any project's
+        settings change (see ProjectList.settings_changed()).
+        """
+        if self._settings_version != self.project_list.settings_version:
+            self._settings_cache = {}
+            self._settings_version = self.project_list.settings_version
+        if key not in self._settings_cache:
+            self._settings_cache[key] = resolve()
+        return self._settings_cache[key]
 
     def get_setting(self,
             setting,
             _called_from_project_list=False,
             use_project_list=True):
+        return list(self._cached_setting(
+            ('values', setting, _called_from_project_list, use_project_list),
+            lambda: self._resolve_setting(
+                setting,
+                _called_from_project_list=_called_from_project_list,
+                use_project_list=use_project_list)))
+
+    def _resolve_setting(self,
+            setting,
+            _called_from_project_list=False,
+            use_project_list=True):
 
         values = []
         for node_id in self.project_settings_nodes:
@@ -88,6 +142,9 @@ class UrtextProject:
             return values[0]
 
     def setting_is_true(self, setting):
+        return self._cached_setting(('true', setting), lambda: self._setting_is_true(setting))
+
+    def _setting_is_true(self, setting):
         setting = self.get_single_setting(setting)
         if setting and setting.true():
             return True
@@ -97,8 +154,10 @@ class UrtextProject:
             setting,
             _called_from_project_list=False,
             use_project_list=True):
-        setting = self.get_setting(setting, _called_from_project_list=_called_from_project_list)
-        return [v.text for v in setting]
+        return list(self._cached_setting(
+            ('text', setting, _called_from_project_list),
+            lambda: [v.text for v in self.get_setting(
+                setting, _called_from_project_list=_called_from_project_list)]))
 
     def get_settings_keys(self):
         keys = []
@@ -112,8 +171,11 @@ class UrtextProject:
             return self.get_settings_keys()
         return propagated_settings
 
+    @timed('initialize')
     def initialize(self, callback=None, initial=True, visible=True, make_current=False, selector=None):
         self.visible = visible
+        if self.project_list.cache_location:
+            self.parse_cache = UrtextParseCache(self, self.project_list.cache_location)
         self.add_call(Exec)
         for call in self.project_list.calls.values():
             self.add_call(call)
@@ -130,12 +192,12 @@ class UrtextProject:
             included_files = self._get_included_files()
             if included_files and visible:
                 self.handle_info_message('Initializing Urtext project from %s' % os.path.basename(self.entry_point))
-            for file in included_files:
-                self._parse_file(file)
+            self._parse_files(included_files)
         if not self.files:
             return False
 
         self._add_paths_from_settings()                        
+        self._update_timer()
         
         if len(self.nodes) == 0 and not self.new_file_node_created:
             return False
@@ -160,6 +222,8 @@ class UrtextProject:
                 self.project_list._init_project(os.path.abspath(utils.get_path_from_link(value.text)))
 
         self.compiled = True
+        if self.parse_cache:
+            self.parse_cache.prune(self.files)
         self.last_compile_time = time.time() - self.time
         self.time = time.time()
         if visible:
@@ -172,9 +236,7 @@ class UrtextProject:
         for p in self.get_settings_paths():
             if self._approve_new_path(p):
                 self.paths.append(p)
-                for file in self._get_included_files():
-                    if file not in self.files:
-                        self._parse_file(file)
+                self._parse_files([f for f in self._get_included_files() if f not in self.files])
         if len(self.get_settings_paths()) > num_paths or (
             len(self.get_setting('file_extensions')) > num_file_extensions):
             self._add_paths_from_settings()
@@ -216,11 +278,17 @@ class UrtextProject:
             return None
         return filename
 
-    def _parse_file(self, filename, try_buffer=False):
+    @timed('parse_file', filename=lambda filename, *args, **kwargs: filename)
+    def _parse_file(self, filename, try_buffer=False, incremental=False):
         if self._filter_filenames(filename) is None:
             self._add_to_excluded_files(filename)
             return False
 
+        if incremental and self.compiled and filename in self.files:
+            buffer = self._reparse_changed_node(filename)
+            if buffer:
+                return buffer
+
         existing_buffer_ids = None
         if filename in self.files:
             existing_buffer_ids = [n.id for n in self.files[filename].get_ordered_nodes()]     
@@ -234,10 +302,142 @@ class UrtextProject:
             if buffer_contents:
                 buffer = self._make_buffer(filename, buffer_contents)
         else:
-            buffer = self.urtext_file(filename, self)
+            buffer = self._read_file(filename)
         if buffer:
             return self._parse_buffer(buffer, existing_buffer_ids=existing_buffer_ids)
 
+    @timed('parse_files')
+    def _parse_files(self, filenames):
+        workers = self.project_list.parse_workers
+        if self.compiled or workers < 2 or (
+            len(filenames) < parallel_parse.min_files_for_parallel_parse):
+            for filename in filenames:
+                self._parse_file(filename)
+            return
+
+        included_filenames = []
+        for filename in filenames:
+            if self._filter_filenames(filename) is None:
+                self._add_to_excluded_files(filename)
+                continue
+            included_filenames.append(filename)
+        filenames = included_filenames
+
+        cached_buffers = {}
+        if self.parse_cache:
+            for filename in filenames:
+                buffer = self.parse_cache.get(filename)
+                if buffer:
+                    cached_buffers[filename] = buffer
+        try:
+            parsed_files = parallel_parse.parse_files(
+                [f for f in filenames if f not in cached_buffers],
+                self.urtext_file,
+                workers)
+        except Exception as e:
+            print('Parallel parsing unavailable (%s), parsing serially' % e)
+            parsed_files = {}
+
+        # merge in the same order as a serial parse so duplicate
+        # titles resolve the same way
+        for filename in filenames:
+            existing_buffer_ids = None
+            if filename in self.files:
+                existing_buffer_ids = [n.id for n in self.files[filename].get_ordered_nodes()]
+                self.drop_buffer(self.files[filename])
+            if filename in cached_buffers:
+                buffer = cached_buffers[filename]
+            elif filename in parsed_files:
+                data, messages = parsed_files[filename]
+                for message_filename, message in messages:
+                    self.log_item(message_filename, message)
+                buffer = load_buffer(data, self)
+                if self.parse_cache:
+                    self.parse_cache.put(filename, buffer, data=data)
+            else:
+                buffer = self._read_file(filename)
+            self._parse_buffer(buffer, existing_buffer_ids=existing_buffer_ids)
+
+    @timed('read_file', filename=lambda filename: filename)
+    def _read_file(self, filename):
+        if not self.parse_cache or self.compiled:
+            return self.urtext_file(filename, self)
+        buffer = self.parse_cache.get(filename)
+        if buffer:
+            return buffer
+        buffer = self.urtext_file(filename, self)
+        self.parse_cache.put(filename, buffer)
+        return buffer
+
+    def _reparse_changed_node(self, filename):
+        """
+        Re-parses only the node changed on disk, if possible.
+        Returns the buffer, or None if the file needs a full parse.
+        """
+        buffer = self.files[filename]
+        if any([self.nodes.get(n.id) is not n or n.resolution for n in buffer.nodes]):
+            return None
+        buffer_titles = set([n.title for n in buffer.nodes])
+        if sum([len(self.nodes_by_title.get(t, ())) for t in buffer_titles]) != len(buffer.nodes):
+            # duplicate titles are re-resolved on a full parse
+            return None
+        replaced = buffer.reparse_changed_node(buffer._read_contents())
+        if not replaced:
+            return None
+        old_node, new_node = replaced
+        if not new_node:
+            return buffer
+
+        # the buffer stays, so only on_node_added runs, and the node
+        # keeps its place in the project's order
+        self._drop_node(old_node, keep_place=True)
+        self._add_node(new_node)
+        self._add_frames(new_node)
+
+        for entry in new_node.metadata.entries():
+            if entry.tag_children:
+                self.dynamic_metadata_entries.append(entry)
+        self._reapply_sub_tags(new_node)
+        self._mark_dynamic_nodes()
+        return buffer
+
+    def _reapply_sub_tags(self, node):
+        """
+        Re-tags node and its descendants from their ancestors, in the
+        order a full parse would, leaving all other nodes untouched.
+        """
+        retagged_nodes = []
+        def add_descendants(n):
+            for child in n.children:
+                add_descendants(child)
+                retagged_nodes.append(child)
+        add_descendants(node)
+        retagged_nodes.append(node)
+        retagged_ids = set([n.id for n in retagged_nodes])
+
+        # as on freshly parsed nodes, until _mark_dynamic_nodes()
+        for n in retagged_nodes:
+            n.metadata.clear_inherited_entries()
+            n.is_dynamic = False
+
+        for tagging_node in retagged_nodes:
+            for entry in tagging_node.metadata.entries():
+                if entry.tag_children and entry.from_node == tagging_node:
+                    self._add_sub_tags(entry, only_node_ids=retagged_ids)
+
+        # ancestors reach the re-tagged nodes only through node's parent
+        ancestor = node.parent
+        while ancestor:
+            for entry in ancestor.metadata.entries():
+                if entry.tag_children and entry.from_node == ancestor and (
+                    ancestor == node.parent or entry.tag_descendants):
+                    self._add_sub_tags(
+                        entry,
+                        next_node=node.parent.id,
+                        only_node_ids=retagged_ids)
+            ancestor = ancestor.parent
+
+    @timed('parse_buffer', filename=lambda buffer, *args, **kwargs: buffer.filename)
     def _parse_buffer(self, buffer, existing_buffer_ids=None):
         for n in buffer.nodes:
             self._resolve_duplicate_titles(n)
@@ -280,15 +480,7 @@ class UrtextProject:
 
         for node in buffer.nodes:
             self._add_node(node)
-            if node.frames:
-                self.frames[node.id] = []
-                for frame in node.frames:
-                    frame.source_node = node
-                    for t in frame.targets:
-                        if t.is_virtual and t.matching_string == "@self":
-                            t.is_node = True
-                            t.node_id = frame.source_node.id
-                    self.frames[node.id].append(frame)
+            self._add_frames(node)
 
         if buffer.identifier:
             self.buffers[buffer.identifier] = buffer
@@ -298,12 +490,8 @@ class UrtextProject:
 
         for entry in buffer.meta_to_node:
             keyname = entry.group(1)
-            source_node = self.get_node_from_position(
-                buffer.filename,
-                entry.span()[0])
-            target_node = self.get_node_from_position(
-                buffer.filename,
-                entry.span()[1] + 1)
+            source_node = buffer.get_node_from_position(entry.span()[0])
+            target_node = buffer.get_node_from_position(entry.span()[1] + 1)
             if source_node and target_node:
                 source_node.metadata.add_entry(
                     keyname,
@@ -331,11 +519,13 @@ class UrtextProject:
         self._mark_dynamic_nodes()
         return buffer
 
+    @timed('verify_links_globally')
     def _verify_links_globally(self):
         links = self.get_all_links()
         for filename in links:
             self._reverify_links(filename)
 
+    @timed('reverify_links', filename=lambda filename, *args, **kwargs: filename)
     def _reverify_links(self, filename, buffer=None):
         if not buffer and filename in self.files:
             buffer = self.files[filename]
@@ -377,6 +567,7 @@ class UrtextProject:
                     contents = contents.replace(old_link.matching_string, rewrites[old_link])
         return contents
 
+    @timed('add_all_sub_tags')
     def _add_all_sub_tags(self):
         for entry in self.dynamic_metadata_entries:
             self._add_sub_tags(entry)
@@ -413,6 +604,7 @@ class UrtextProject:
                 return False
         return True      
 
+    @timed('resolve_duplicate_titles')
     def _resolve_duplicate_titles(self, node):
         duplicate_titled_nodes = self._find_duplicate_title(node)
         if duplicate_titled_nodes:
@@ -433,12 +625,21 @@ class UrtextProject:
                     node.buffer.has_errors = True
                     return
                 else:
+                    self._unindex_links(d)
+                    self._unindex_node(d)
+                    del self._node_order[old_id]
                     d.id = resolution['resolved_id']
                     self.nodes[resolution['resolved_id']] = d
                     del self.nodes[old_id]
+                    self._index_links(d)
+                    self._index_node(d)
+                    self._mark_node_changed(d)
+                    self.frame_dependencies.node_changed(old_id)
+                    self.snapshot_writer.node_id_changed(old_id)
                     if old_id in self.project_settings_nodes:
                         self.project_settings_nodes.remove(old_id)
                         self.project_settings_nodes.append(resolution['resolved_id'])
+                        self.project_list.settings_changed()
                     self.run_hook('on_node_id_changed', self, old_id, resolution['resolved_id'])
             resolution = node.resolve_id(allocated_ids=list(self.nodes))
             if not resolution['resolved_id']:
@@ -457,11 +658,107 @@ class UrtextProject:
     def _add_node(self, new_node):
    
         new_node.project = self
+        if new_node.id in self.nodes:
+            self._unindex_links(self.nodes[new_node.id])
+            self._unindex_node(self.nodes[new_node.id])
+            self._mark_node_changed(self.nodes[new_node.id])
         self.nodes[new_node.id] = new_node
-        if new_node.title == 'project_settings':
+        self._index_links(new_node)
+        self._index_node(new_node)
+        self._mark_node_changed(new_node)
+        if new_node.title == 'project_settings' and (
+                new_node.id not in self.project_settings_nodes):
             self.project_settings_nodes.append(new_node.id)
+            self.project_list.settings_changed()
         self.run_hook('on_node_added', new_node)
 
+    def _index_links(self, node):
+        # mirrors the insertion order of self.nodes
+        if node.id not in self._node_order:
+            self._node_order[node.id] = self._next_node_order
+            self._next_node_order += 1
+        for target_id in node.links_ids():
+            if target_id:
+                self.links_to.setdefault(target_id, set()).add(node.id)
+
+    def _unindex_links(self, node):
+        for target_id in node.links_ids():
+            if target_id in self.links_to:
+                self.links_to[target_id].discard(node.id)
+                if not self.links_to[target_id]:
+                    del self.links_to[target_id]
+
+    def _index_node(self, node):
+        self.nodes_by_title.setdefault(node.title, set()).add(node.id)
+        self.nodes_by_filename.setdefault(node.filename, set()).add(node.id)
+        if node.resolution:
+            self.nodes_by_resolution.setdefault(node.resolution, set()).add(node.id)
+
+    def _unindex_node(self, node):
+        for index, key in [
+                (self.nodes_by_title, node.title),
+                (self.nodes_by_filename, node.filename),
+                (self.nodes_by_resolution, node.resolution)]:
+            if key in index:
+                index[key].discard(node.id)
+                if not index[key]:
+                    del index[key]
+
+    def _nodes_from_index(self, index, key):
+        """ the nodes listed under key, in project order """
+        return [self.nodes[node_id] for node_id in sorted(
+            index.get(key, []),
+            key=lambda node_id: self._node_order[node_id])]
+
+    def _node_indexes_are_consistent(self):
+        """ compares the title, filename and resolution indexes against a full scan """
+        indexes = ({}, {}, {})
+        for node in self.nodes.values():
+            indexes[0].setdefault(node.title, set()).add(node.id)
+            indexes[1].setdefault(node.filename, set()).add(node.id)
+            if node.resolution:
+                indexes[2].setdefault(node.resolution, set()).add(node.id)
+        return indexes == (
+            self.nodes_by_title,
+            self.nodes_by_filename,
+            self.nodes_by_resolution)
+
+    def _mark_node_changed(self, node):
+        self.metadata_index.mark(node)
+        self.search_index.mark(node)
+        self.frame_dependencies.node_changed(node.id)
+        self.snapshot_writer.node_changed(node)
+
+    def publish_snapshot(self):
+        """
+        Replaces self.snapshot if the project changed. Call only
+        from the thread that changes the project.
+        """
+        if self.compiled:
+            return self.snapshot_writer.publish()
+
+    def _links_index_is_consistent(self):
+        """ compares the reverse link index against a full scan """
+        links_to = {}
+        for node in self.nodes.values():
+            for target_id in node.links_ids():
+                if target_id:
+                    links_to.setdefault(target_id, set()).add(node.id)
+        return links_to == self.links_to and set(self._node_order) == set(self.nodes)
+
+    def _add_frames(self, node):
+        if node.frames:
+            self.frames[node.id] = []
+            for frame in node.frames:
+                frame.source_node = node
+                for t in frame.targets:
+                    if t.is_virtual and t.matching_string == "@self":
+                        t.is_node = True
+                        t.node_id = frame.source_node.id
+                self.frames[node.id].append(frame)
+            self.hooks.set('frames', node.id, [
+                op for frame in self.frames[node.id] for op in frame.operations])
+
     def get_source_node(self, filename, position):  # future
         if filename not in self.files:
             return None, None
@@ -489,6 +786,7 @@ class UrtextProject:
             node._set_contents(contents, preserve_title=preserve_title)
             return node.file
 
+    @timed('mark_dynamic_nodes')
     def _mark_dynamic_nodes(self):
         for frame in self._get_all_frames():
             for node_id in frame.target_ids():
@@ -508,7 +806,7 @@ class UrtextProject:
         self.run_hook('on_buffer_dropped', buffer.filename)
         if buffer.identifier and buffer.identifier in self.buffers:
             del self.buffers[buffer.identifier]
-        file_nodes = [n for n in self.nodes.values() if n.filename == buffer.filename]
+        file_nodes = self._nodes_from_index(self.nodes_by_filename, buffer.filename)
         for node in file_nodes:
             self._drop_node(node)
         if buffer.filename in self.files:
@@ -516,15 +814,27 @@ class UrtextProject:
         if buffer.filename in self.messages:
             self.messages[buffer.filename] = []
 
-    def _drop_node(self, node):
+    def _drop_node(self, node, keep_place=False):
+        """
+        keep_place leaves the node's id in self.nodes and its order,
+        for a node replaced at once by one with the same id
+        """
         if node.id in self.nodes:
             self._remove_dynamic_metadata_entries(node.id)
             if node.id in self.project_settings_nodes:
-                self.project_settings_nodes.remove(node.id)
+                if not keep_place:
+                    self.project_settings_nodes.remove(node.id)
+                self.project_list.settings_changed()
             self._remove_sub_tags(node.id)
             if node.id in self.frames:
                 del self.frames[node.id]
-            del self.nodes[node.id]
+                self.hooks.remove('frames', node.id)
+            self._unindex_links(self.nodes[node.id])
+            self._unindex_node(self.nodes[node.id])
+            self._mark_node_changed(self.nodes[node.id])
+            if not keep_place:
+                del self._node_order[node.id]
+                del self.nodes[node.id]
             del node
 
     def delete_file(self, filename):
@@ -580,7 +890,7 @@ class UrtextProject:
                 suffix += 1
             filename = resolved_filename
 
-        utils.write_file_contents(filename, new_node_contents)
+        self.write_file(filename, new_node_contents)
         new_file = self.urtext_file(filename, self)
         buffer = self._parse_file(filename)
 
@@ -591,7 +901,7 @@ class UrtextProject:
                     ensure_timestamp_unique=True,
                     contents_format=contents_format,
                     metadata=metadata)
-            utils.write_file_contents(filename, new_node_contents)
+            self.write_file(filename, new_node_contents)
             self.drop_buffer(buffer)
             new_file = self.urtext_file(filename, self)
             buffer = self._parse_file(filename)
@@ -656,7 +966,7 @@ class UrtextProject:
     
         if '$timestamp' in template_string:
             timestamp = self.timestamp()
-            if ensure_timestamp_unique and timestamp.unwrapped_string in [n.resolution for n in self.nodes.values()]:
+            if ensure_timestamp_unique and timestamp.unwrapped_string in self.nodes_by_resolution:
                 timestamp = self.timestamp(add_seconds=True) 
             if unwrap_timestamps:
                 timestamp = timestamp.unwrapped_string
@@ -787,21 +1097,32 @@ class UrtextProject:
         return nodes
 
     def _sort_nodes(self, nodes, keys, reverse=False):
+        sorted_nodes = []
+        for node, detail in self._sort_nodes_with_details(nodes, keys, reverse=reverse):
+            if detail is not None:
+                node.display_detail = detail
+            sorted_nodes.append(node)
+        return sorted_nodes
+
+    def _sort_nodes_with_details(self, nodes, keys, reverse=False):
+        """
+        (node, detail) pairs in sorted order, the detail None for nodes
+        with none of the keys; changes no node, so the project snapshot
+        can use it
+        """
         remaining_nodes = nodes
         sorted_nodes = []
         use_timestamp_setting = self.get_setting_as_text('use_timestamp')
-        detail_key = self.get_single_setting('node_browser_detail').text
+        detail_setting = self.get_single_setting('node_browser_detail')
+        detail_key = detail_setting.text if detail_setting else None
         for k in keys:
             use_timestamp = k in use_timestamp_setting
-            node_group = [r for r in remaining_nodes if r.metadata.get_first_value(k) is not None]
-            remaining_nodes = [r for r in remaining_nodes if r not in node_group]
+            with_values = set(self.metadata_index.get_nodes_with_values(k))
+            node_group = [r for r in remaining_nodes if r.id in with_values]
+            remaining_nodes = [r for r in remaining_nodes if r.id not in with_values]
             if node_group:
                 if use_timestamp:
-                    node_group = sorted(
-                        node_group,
-                        key=lambda node: node.metadata.get_first_value(k).timestamp if node.metadata.get_first_value(
-                            k) else None,
-                        reverse=reverse)
+                    node_group = self.sort_nodes_by_timestamp(node_group, k, reverse=reverse)
                 else:
                     node_group = sorted(
                         node_group,
@@ -817,11 +1138,40 @@ class UrtextProject:
                             detail = detail.text
                     else:
                         detail = ''
-                    node.display_detail = detail
-                sorted_nodes.extend(node_group)
-        sorted_nodes.extend([r for r in remaining_nodes if r not in sorted_nodes])
+                    sorted_nodes.append((node, detail))
+        sorted_nodes.extend([(node, None) for node in remaining_nodes])
         return sorted_nodes
 
+    def sort_nodes_by_timestamp(self, nodes, key, reverse=False):
+        """
+        Orders nodes by the timestamp of their first value for key,
+        reading the index instead of sorting. Ties keep their given
+        order; nodes without a timestamp follow, also in given order.
+        """
+        given_order = {}
+        nodes_by_id = {}
+        for node in nodes:
+            given_order.setdefault(node.id, len(given_order))
+            nodes_by_id[node.id] = node
+        dates, node_ids = self.metadata_index.get_dates(key)
+        groups = []
+        for index in range(len(node_ids)):
+            if node_ids[index] not in given_order:
+                continue
+            if groups and groups[-1][0] == dates[index]:
+                groups[-1][1].append(node_ids[index])
+            else:
+                groups.append((dates[index], [node_ids[index]]))
+        if reverse:
+            groups.reverse()
+        ordered = []
+        for date, group in groups:
+            ordered.extend(sorted(group, key=lambda node_id: given_order[node_id]))
+        dated = set(ordered)
+        ordered = [nodes_by_id[node_id] for node_id in ordered]
+        ordered.extend([n for n in nodes if n.id not in dated])
+        return ordered
+
     def get_node_from_position(self, filename, position, identifier=None):
         if identifier and identifier in self.buffers:
             return self.buffers[identifier].get_node_from_position(position)
@@ -829,16 +1179,21 @@ class UrtextProject:
             return self.files[filename].get_node_from_position(position)
 
     def get_node(self, node_id):
+        self.frame_dependencies.read(('node', node_id))
         if node_id in self.nodes:
             return self.nodes[node_id]
 
     def get_links_to(self, to_id, include_dynamic=True):
-        links_to = [n for n in self.nodes.values() if to_id in n.links_ids()]
+        self.frame_dependencies.read(('links_to', to_id))
+        links_to = [self.nodes[node_id] for node_id in sorted(
+            self.links_to.get(to_id, []),
+            key=lambda node_id: self._node_order[node_id])]
         if not include_dynamic:
             links_to = [n for n in links_to if not n.is_dynamic]
         return links_to
 
     def get_links_from(self, from_id, include_dynamic=True):
+        self.frame_dependencies.read(('nodes',))
         from_node = self.get_node(from_id)
         if from_node:
             links = from_node.links_ids()
@@ -856,7 +1211,7 @@ class UrtextProject:
         return links
 
     def _find_duplicate_title(self, node):
-        return [n for n in self.nodes.values() if n.title == node.title]
+        return self._nodes_from_index(self.nodes_by_title, node.title)
 
     def log_item(self, filename, message):
         self.messages.setdefault(filename, [])
@@ -929,10 +1284,44 @@ class UrtextProject:
             self.run_editor_method('close_inactive', extensions=extensions)
 
     def on_modified(self, filename, flags=[]):
-        if self.compiled and filename in self._get_included_files():
+        self._update_timer()
+        if self.compiled and self._is_included_file(filename):
             self._compile_file(filename, flags=['-on_modified'] + flags)    
         self.close_inactive()
-        self._sync_file_list()
+        if not self.project_list.is_watching_files() or (
+            self._synced_paths != (
+                self.project_list.settings_version,
+                self._get_settings_paths())):
+            # otherwise the file watcher reports added and removed files
+            self._sync_file_list()
+
+    def on_files_changed(self, filenames, rescan=False):
+        """
+        Brings the project up to date with files changed outside the
+        editor, as reported by the file watcher. Files that no longer
+        exist are dropped; rescan also checks the project's paths.
+        """
+        if not self.compiled:
+            return
+        self._update_timer()
+        # drop files first, so a renamed file's nodes are not taken
+        # for duplicates of the ones under its old name
+        for filename in filenames:
+            if not os.path.exists(filename) and filename in self.files:
+                self._drop_missing_file(filename)
+        for filename in filenames:
+            if not os.path.exists(filename):
+                continue
+            elif filename in self.files:
+                if self.files[filename].contents_did_change():
+                    self._compile_file(filename, flags=['-on_modified'])
+            elif self._is_included_file(filename):
+                self._compile_file(filename, flags=['-on_modified'])
+            elif self.is_project_file(filename):
+                # may be in a path not yet added
+                rescan = True
+        if rescan:
+            self._sync_file_list()
 
     def visit_node(self, node_id):
         self.run_hook('on_node_visited', self, node_id)
@@ -948,15 +1337,33 @@ class UrtextProject:
         self._verify_paths_from_settings()
         # self._add_other_entry_points()
         self._drop_missing_files()
+        self._synced_paths = (
+            self.project_list.settings_version,
+            self._get_settings_paths())
+        self.project_list.on_project_paths_synced(self)
 
     def _drop_missing_files(self):
         included_files = self._get_included_files()
         for filename in [f for f in list(self.files) if f not in included_files]:
-            self.log_item(
-                filename,
-                {'top_message': filename + ' no longer seen in project path. Dropping it from the project.'})
-            self.drop_buffer(self.files[filename])
+            self._drop_missing_file(filename)
+
+    def _drop_missing_file(self, filename):
+        self.log_item(
+            filename,
+            {'top_message': filename + ' no longer seen in project path. Dropping it from the project.'})
+        self.drop_buffer(self.files[filename])
+
+    def _is_included_file(self, filename):
+        """ as filename in self._get_included_files(), without listing the paths """
+        directory = os.path.dirname(filename)
+        for pathname in self.paths:
+            if not os.path.isdir(pathname):
+                pathname = os.path.dirname(pathname)
+            if pathname == directory:
+                return os.path.exists(filename) and self._include_file(filename)
+        return False
 
+    @timed('list_files')
     def _get_included_files(self):
         files = []
         for pathname in self.paths:
@@ -967,6 +1374,13 @@ class UrtextProject:
         return [f for f in files if self._include_file(f)]
 
     def get_settings_paths(self):
+        return list(self._get_settings_paths())
+
+    def _get_settings_paths(self):
+        """
+        The same tuple is returned for as long as the paths are
+        unchanged, so callers can compare it by identity.
+        """
         paths = []
         if self.entry_path is not None:
             paths.append(os.path.abspath(self.entry_path))
@@ -987,11 +1401,36 @@ class UrtextProject:
                         recurse_subfolders = n.metadata.get_first_value('recurse_subfolders')
                         if recurse_subfolders:                        
                             if path:
-                                for dirpath, dirnames, filenames in os.walk(path):
-                                    if '/.git' in dirpath or '/_diff' in dirpath:
-                                        continue
-                                    paths.append(os.path.abspath(dirpath))
-        return paths
+                                paths.extend(self._walk_subfolders(path))
+        paths = tuple(paths)
+        if paths != self._settings_paths:
+            self._settings_paths = paths
+        return self._settings_paths
+
+    def _walk_subfolders(self, path):
+        """
+        Walks are kept with the mtime of each directory they saw and
+        redone only when one of those directories has changed.
+        """
+        if path in self._walked_paths:
+            dirpaths, mtimes = self._walked_paths[path]
+            try:
+                if all(os.stat(d).st_mtime_ns == mtime for d, mtime in mtimes.items()):
+                    return dirpaths
+            except OSError:
+                pass
+        dirpaths = []
+        mtimes = {}
+        for dirpath, dirnames, filenames in os.walk(path):
+            if '/.git' in dirpath or '/_diff' in dirpath:
+                continue
+            try:
+                mtimes[dirpath] = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                continue
+            dirpaths.append(os.path.abspath(dirpath))
+        self._walked_paths[path] = (dirpaths, mtimes)
+        return dirpaths
 
     def _include_file(self, filename):
         if filename in self.excluded_files:
@@ -1032,16 +1471,8 @@ class UrtextProject:
             for n in list(self.nodes)]
 
     def get_keys_with_frequency(self):
-        key_occurrences = {}
-        exclude = self.get_setting_as_text('exclude_from_star')
-        exclude.extend(self.get_settings_keys())
-        for node in list(self.nodes.values()):
-            node_keys = node.metadata.get_keys(exclude=exclude)
-            for key in node_keys:
-                key_occurrences[key] = key_occurrences.get(key, 0)
-                key_occurrences[key] += node_keys[key]
-
-        return key_occurrences
+        self.frame_dependencies.read(('meta', '*'))
+        return self.metadata_index.get_keys_with_frequency()
 
     def get_all_keys(self):
         key_occurrences = self.get_keys_with_frequency()
@@ -1056,13 +1487,8 @@ class UrtextProject:
             return sorted(unique_keys)
 
     def get_all_values_for_key_with_frequency(self, key):
-        values = {}
-        for node in self.nodes.values():
-            values_occurrences = node.metadata.get_values_with_frequency(key)
-            for v in values_occurrences:
-                values[v.text] = values.get(v.text, 0)
-                values[v.text] += values_occurrences[v]
-        return values
+        self.frame_dependencies.read(('meta', key.lower()))
+        return self.metadata_index.get_values_with_frequency(key)
 
     def get_all_values_for_key(self, key, substitute_timestamp=True):
         """
@@ -1092,27 +1518,27 @@ class UrtextProject:
             values = [values]
         results = set()
 
+        if key == '_contents':
+            self.frame_dependencies.read(('contents',))
+        elif key == '_links_to':
+            self.frame_dependencies.read(*[('links_to', v) for v in values])
+        elif key != '_links_from':
+            self.frame_dependencies.read(('meta', key.lower()))
+
         if operator in ['before', 'after']:
             compare_date = date_from_timestamp(values[0][1:-1])
-
             if compare_date:
                 if operator == 'before':
-                    results = [n for n in self.nodes.values() if
-                               default_date != n.metadata.get_date(key) < compare_date]
-                if operator == 'after':
-                    results = [n for n in self.nodes.values() if
-                               n.metadata.get_date(key) > compare_date != default_date]
+                    results.update(self.metadata_index.get_nodes_before(key, compare_date))
+                if operator == 'after' and compare_date != default_date:
+                    results.update(self.metadata_index.get_nodes_after(key, compare_date))
+            return [self.nodes[n] for n in results]
 
         if key == '_contents' and operator == '?':
-            for node in list(self.nodes.values()):
-                if node.is_dynamic:
-                    continue
-                contents = node.stripped_contents
-                lower_contents = contents.lower()
-
-                for v in values:
-                    if v.lower() in lower_contents:
-                        results.add(node.id)
+            for v in values:
+                results.update([
+                    node_id for node_id in self.search_index.find(v)
+                    if not self.nodes[node_id].is_dynamic])
 
         elif key == '_links_to':
             for v in values:
@@ -1131,38 +1557,44 @@ class UrtextProject:
             for k in keys:
                 for value in values:
                     if value == '*':
-                        results.update([n for n in self.nodes if self.nodes[n].metadata.get_values(k)])
+                        results.update(self.metadata_index.get_nodes_with_values(k))
+                        continue
+                    if isinstance(value, UrtextTimestamp):
+                        results.update([
+                            n for n in self.metadata_index.get_nodes_with_values(k) if
+                            value in [v.timestamp for v in self.nodes[n].metadata.get_values(k)]])
                         continue
                     if k in numerical_keys_setting:
                         try:
                             value = float(value)
                         except ValueError:
-                            value = float('inf')
-
-                    use_timestamp = False
-                    if isinstance(value, UrtextTimestamp):
-                        use_timestamp = True
-
-                    if k in case_sensitive_setting:
-                        results.update([
-                            n for n in self.nodes if
-                            value in [
-                                v.text for v in self.nodes[n].metadata.get_values(k) if v.text]])
-                    else:
-                        if isinstance(value, str):
-                            value = value.lower()
-                        for n in self.nodes.values():
-                            found_values = n.metadata.get_values(k)
-                            if use_timestamp:
-                                if value in [v.timestamp for v in found_values]:
-                                    results.update([n.id])
-                            else:
-                                if value in [v.text_lower for v in found_values]:
-                                    results.update([n.id])
+                            continue
+                        for text in self.metadata_index.get_values(k):
+                            try:
+                                if float(text) != value:
+                                    continue
+                            except ValueError:
+                                continue
+                            results.update(self.metadata_index.get_nodes_with_value(
+                                k, text, case_sensitive=True))
+                        continue
+                    results.update(self.metadata_index.get_nodes_with_value(
+                        k, value, case_sensitive=k in case_sensitive_setting))
 
         results = list(results)
         return [self.nodes[n] for n in results]
 
+    def search(self, query, include_dynamic=False):
+        """
+        Returns nodes containing every term in query,
+        ranked by title matches, then by occurrences.
+        """
+        self.frame_dependencies.read(('contents',))
+        results = [self.nodes[node_id] for node_id, score in self.search_index.search(query)]
+        if not include_dynamic:
+            results = [n for n in results if not n.is_dynamic]
+        return results
+
     def get_file_and_position(self, node_id):
         if node_id in self.nodes:
             filename = self.get_file_name(node_id)
@@ -1171,73 +1603,188 @@ class UrtextProject:
         return None, None
 
     def run_hook(self, hook_name, *args, **kwargs):
-        for frame in self._get_all_frames():
-            for op in frame.operations:
-                hook = getattr(op, hook_name, None)
-                if hook and callable(hook):
-                    hook(*args, **kwargs)
-        for call in self.project_instance_calls.values():
-            hook = getattr(call, hook_name, None)
-            if hook and callable(hook):
-                hook(*args, **kwargs)
-        for call in self.project_list.project_list_instance_calls.values():
-            hook = getattr(call, hook_name, None)
-            if hook and callable(hook):
-                hook(*args, **kwargs)
-        for selector in self.selectors.values():
-            hook = getattr(selector, hook_name, None)
-            if hook and callable(hook):
-                hook(*args, **kwargs)
+        start = time.time()
+        for hook in chain(
+                self.hooks.get(hook_name, 'frames', 'calls'),
+                self.project_list.hooks.get(hook_name),
+                self.hooks.get(hook_name, 'selectors')):
+            hook(*args, **kwargs)
+        self.hooks.record(hook_name, time.time() - start)
 
     """ Project Compile """
 
+    def _update_timer(self):
+        """ timing is on if the project list profiles or the `profile` setting is true """
+        self.timer.enabled = self.project_list.profile or self.setting_is_true('profile')
+
+    def profile_report(self):
+        """ time spent by phase, file and frame since the timer was last reset """
+        report = self.timer.report()
+        report['frame_runs'] = self.frame_stats.report()
+        return report
+
+    def _begin_batched_edits(self):
+        if self.batched_edits is None:
+            self.batched_edits = set()
+
+    def _apply_batched_edits(self):
+        """ applies each buffer's deferred edits at once """
+        buffers = self.batched_edits or set()
+        self.batched_edits = None
+        for buffer in buffers:
+            buffer.apply_edits()
+
+    def _run_waiting_jobs(self):
+        """
+        Lets interactive jobs run between frames of a long compile,
+        with this compile's pending edits applied first. Until the
+        project has compiled, compiles on save and file changes wait,
+        since they would find it not yet compiled and be skipped.
+        """
+        below = None if self.compiled else NORMAL
+        if not self.project_list.has_waiting_jobs(below=below):
+            return False
+        batching = self.batched_edits is not None
+        self._apply_batched_edits()
+        self.project_list.run_waiting_jobs(below=below)
+        if batching:
+            self._begin_batched_edits()
+        return True
+
+    def _frame_is_current(self, frame):
+        """
+        whether a frame collected before other jobs ran is still the
+        project's, and not dropped or replaced with its node
+        """
+        node = frame.source_node
+        return self.nodes.get(node.id) is node and any(
+            f is frame for f in self.frames.get(node.id, []))
+
+    @timed('compile')
     def _compile(self):
         num_calls = len(list(self.calls.keys()))
         num_project_calls = len(list(self.project_instance_calls.keys()))
         modified_buffers = set()
         dynamic_nodes = set()
+        self._begin_batched_edits()
         for frame in self._get_all_frames():
+            if self._run_waiting_jobs() and not self._frame_is_current(frame):
+                # frames added meanwhile are stale, so run below
+                continue
             self._run_frame(frame)
         if len(self.calls.keys()) > num_calls or len(self.project_instance_calls.keys()) > num_project_calls:
             return self._compile()
+        verify = self.setting_is_true('verify_incremental_compile')
+        stale_frames = []
         for frame in self._get_all_frames():
+            if self.frame_dependencies.is_stale(frame):
+                stale_frames.append(frame)
+            elif verify:
+                self._verify_frame_output(frame)
+        for frame in self.frame_dependencies.order(stale_frames):
+            if self._run_waiting_jobs() and not self._frame_is_current(frame):
+                continue
             self._run_frame(frame)
+        self._apply_batched_edits()
         self._add_all_sub_tags()
         self._verify_links_globally()
 
+    @timed('compile_file', filename=lambda filename, *args, **kwargs: filename)
     def _compile_file(self, filename, flags=[]):
         modified_buffers = set()
         dynamic_nodes = set()
-        buffer = self._parse_file(filename)
+        frames_run = set()
+        buffer = self._parse_file(filename, incremental=True)
         if buffer:
+            self._begin_batched_edits()
             for node in buffer.nodes:
                 for frame in list(self._get_frames(target_node=node, source_node=node)):
+                    frames_run.add(frame_key(frame))
                     m_buffers, d_nodes = self._run_frame(frame, flags=flags, buffer=buffer)
                     modified_buffers.update(m_buffers)
                     dynamic_nodes.update(d_nodes)
                     for b in modified_buffers:
                         for node in b.nodes:
                             self._verify_frame_present_if_marked(node.id, buffer=b)
+            self._apply_batched_edits()
             modified_buffers.add(buffer)
             for b in list(modified_buffers):
                 verified_links_content = self._reverify_links(b.filename, buffer=b)
-                b.set_buffer_contents(verified_links_content)
+                if verified_links_content != b._get_contents() or (
+                    syntax.urtext_messages_c.search(verified_links_content)):
+                    b.set_buffer_contents(verified_links_content)
                 b.write_buffer_contents(run_hook=True)
             for d in list(dynamic_nodes):
                 node = self.get_node(d)
                 if node:
                     node.is_dynamic = True
+            self._run_dependent_frames(frames_run, flags=flags)
         if filename in self.files:
             self.run_hook('after_on_file_modified', filename)  
 
+    @timed('run_dependent_frames')
+    def _run_dependent_frames(self, frames_run, flags=None):
+        """
+        Runs frames elsewhere in the project whose recorded inputs
+        changed, writing their targets, until none is left. Frames
+        with untracked calls only run when their own file changes.
+        """
+        while True:
+            stale_frames = [
+                f for f in self._get_all_frames()
+                if frame_key(f) not in frames_run and
+                self.frame_dependencies.is_tracked(f) and
+                self.frame_dependencies.is_stale(f)]
+            if not stale_frames:
+                break
+            modified_buffers = set()
+            dynamic_nodes = set()
+            self._begin_batched_edits()
+            for frame in self.frame_dependencies.order(stale_frames):
+                frames_run.add(frame_key(frame))
+                m_buffers, d_nodes = self._run_frame(frame, flags=flags)
+                modified_buffers.update([b for b in m_buffers if b])
+                dynamic_nodes.update(d_nodes)
+            self._apply_batched_edits()
+            for b in modified_buffers:
+                b.write_buffer_contents(run_hook=True)
+            for d in dynamic_nodes:
+                node = self.get_node(d)
+                if node:
+                    node.is_dynamic = True
+        if self.setting_is_true('verify_incremental_compile'):
+            for frame in self._get_all_frames():
+                if frame_key(frame) not in frames_run and self.frame_dependencies.is_tracked(frame):
+                    self._verify_frame_output(frame)
+
+    def _verify_frame_output(self, frame):
+        """ debugging: checks a skipped frame against a full run """
+        if frame.is_manual():
+            return True
+        last_output = self.frame_dependencies.last_output(frame)
+        if frame.process() == last_output:
+            return True
+        self.log_item(frame.source_node.filename, {
+            'top_message': ''.join([
+                'Frame in ',
+                frame.source_node.link(),
+                ' was skipped by incremental compile, but its output changed'])})
+        return False
+
+    @timed('run_frame', frame=lambda frame, *args, **kwargs: frame.source_node.id)
     def _run_frame(self, frame, flags=None, buffer=None):
         if flags is None:
             flags = []
         modified_buffers = []
         dynamic_nodes = []
         if frame.is_manual():
-            return []
+            return [], []
+        self.frame_dependencies.start(frame)
+        start = time.perf_counter()
         output = frame.process(flags=flags)
+        seconds = time.perf_counter() - start
+        self.frame_dependencies.finish(frame, output)
+        self._record_frame_run(frame, flags, seconds, output)
         for target in frame.targets:
             if output not in [False, None]:
                 if target.is_node and not self.get_node(target.node_id):
@@ -1260,6 +1807,50 @@ class UrtextProject:
                     dynamic_nodes.append(target.node_id)
         return modified_buffers, dynamic_nodes
 
+    def _record_frame_run(self, frame, flags, seconds, output):
+        if self.timer.enabled:
+            self.frame_stats.record(
+                frame_key(frame),
+                self._frame_run_reason(flags),
+                seconds,
+                frame.operation_times,
+                len(frame.included_nodes),
+                len(output) if isinstance(output, str) else 0)
+        budget = self._get_frame_time_budget()
+        if budget and seconds > budget:
+            self.log_item(frame.source_node.filename, {
+                'top_message': ''.join([
+                    'Frame in ',
+                    frame.source_node.link(),
+                    ' took %.3fs, over the frame_time_budget of %.3fs (%s)' % (
+                        seconds, budget, self._frame_run_reason(flags))])})
+
+    def _frame_run_reason(self, flags):
+        for flag, reason in [
+            ('-on_modified', 'on_modified'),
+            ('-link_hovered', 'link_hover'),
+            ('-target_link_clicked', 'action_link'),
+            ]:
+            if flag in flags:
+                return reason
+        return 'compile' if self.compiled else 'initial_compile'
+
+    def _get_frame_time_budget(self):
+        """ seconds from the frame_time_budget setting, or None """
+        return self._cached_setting(('frame_time_budget',), self._resolve_frame_time_budget)
+
+    def _resolve_frame_time_budget(self):
+        budget = self.get_single_setting('frame_time_budget')
+        if budget is None:
+            return None
+        if not isinstance(budget, float):
+            budget = budget.num()
+        return budget if 0 < budget < float('inf') else None
+
+    def slowest_frames(self, limit=10):
+        """ the frames that took longest in total while the timer was on, slowest first """
+        return self.frame_stats.report(limit)
+
     def _direct_output(self, output, target, frame, buffer=None):
         if target.is_node and target.node_id in self.nodes:
             return self._set_node_contents(target.node_id, ''.join([syntax.dynamic_marker, output]), buffer=buffer)            
@@ -1289,7 +1880,7 @@ class UrtextProject:
             if target.matching_string == '@popup':
                 return self.run_editor_method('popup', output)
         if target.is_file:
-            return utils.write_file_contents(os.path.join(self.entry_path, target.path), output)
+            return self.write_file(os.path.join(self.entry_path, target.path), output)
         if target.is_raw_string and target.matching_string in self.nodes:  # fallback
             return self._set_node_contents(target.matching_string, ''.join([syntax.dynamic_marker, output]), buffer=buffer)
 
@@ -1298,7 +1889,8 @@ class UrtextProject:
     def _add_sub_tags(self,
                       entry,
                       next_node=None,
-                      visited_nodes=None):
+                      visited_nodes=None,
+                      only_node_ids=None):
 
         if visited_nodes is None:
             visited_nodes = []
@@ -1311,6 +1903,8 @@ class UrtextProject:
 
         for child in self.nodes[source_node_id].children:
 
+            if only_node_ids is not None and child.id not in only_node_ids:
+                continue
             uid = source_node_id + child.id
             if uid in visited_nodes:
                 continue
@@ -1328,6 +1922,8 @@ class UrtextProject:
                     from_node=entry.from_node,
                     tag_descendants=entry.tag_descendants)
                 if node_to_tag not in entry.from_node.target_nodes:
+                    if not entry.from_node.target_nodes:
+                        entry.from_node.target_nodes = []
                     entry.from_node.target_nodes.append(node_to_tag)
 
             visited_nodes.append(uid)
@@ -1336,7 +1932,8 @@ class UrtextProject:
                 self._add_sub_tags(
                     entry,
                     next_node=node_to_tag,
-                    visited_nodes=visited_nodes)
+                    visited_nodes=visited_nodes,
+                    only_node_ids=only_node_ids)
         self.run_hook(
             'on_sub_tags_added',
             source_node_id,
@@ -1381,17 +1978,21 @@ class UrtextProject:
 
         self._parse_file(filename, try_buffer=True)
         if filename in self.files:
-            node_id = None
-            for node in self.files[filename].nodes:
-                for r in node.ranges:
-                    if position in range(r[0], r[1] + 1):  # +1 in case the cursor is in the last position of the node.
-                        node_id = node.id
-                        break
-            if node_id:
-                link = self.project_list.build_contextual_link(node_id, include_project=include_project)
+            node = self.files[filename].get_node_from_position(position)
+            if node:
+                link = self.project_list.build_contextual_link(node.id, include_project=include_project)
                 return self.run_editor_method('set_clipboard', link)
         self.handle_info_message('No Node found here')
 
+    def write_file(self, filename, contents):
+        """
+        Writes contents to filename, or passes them to the editor's
+        write_file method if it has one, as a dry run does
+        """
+        if 'write_file' in self.editor_methods:
+            return self.editor_methods['write_file'](filename, contents)
+        return utils.write_file_contents(filename, contents)
+
     def run_editor_method(self, method_name, *args, **kwargs):
         if method_name in self.editor_methods:
             return self.editor_methods[method_name](*args, **kwargs)
@@ -1410,6 +2011,7 @@ class UrtextProject:
                 global_call = call(self)
                 global_call.on_added()
                 self.project_instance_calls[call.name[0]] = (call(self))
+                self.hooks.set('calls', call.name[0], [self.project_instance_calls[call.name[0]]])
                 if call.name in propagated_calls or propagate_all_calls:
                     self.project_list.add_call(call)
         else:
@@ -1445,7 +2047,7 @@ class UrtextProject:
             self.handle_info_message('call %s is not available' % call_name)
             return None
         op = call(self)
-        return self.project_list.execute(op.run, *args, **kwargs)
+        return self.project_list.execute(op.run, *args, priority=INTERACTIVE, **kwargs)
 
     def add_selector(self, selector):
         propagated_selectors = self.get_setting_as_text('propagate_selectors')
@@ -1455,6 +2057,7 @@ class UrtextProject:
         selector_instance = selector(self.project_list)
         selector_instance.source_node = self.last_exec_node
         self.selectors[selector_instance.selector_string] = selector_instance
+        self.hooks.set('selectors', selector_instance.selector_string, [selector_instance])
         if selector_instance.selector_string in propagated_selectors or propagate_all_selectors:
             self.project_list.selectors[selector_instance.selector_string] = selector_instance
         self.last_exec_node = None
@@ -1,7 +1,7 @@
 import os
-import concurrent.futures
 import sys
 import shutil
+import threading
 
 if os.path.exists(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'sublime.txt')):
     custom_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
@@ -9,6 +9,10 @@ if os.path.exists(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'sub
 
 from urtext.project import UrtextProject
 from urtext.call import UrtextCall
+from urtext.compile_scheduler import CompileScheduler
+from urtext.file_watcher import FileWatcher
+from urtext.priority_executor import PriorityExecutor, INTERACTIVE, NORMAL, BACKGROUND
+from urtext.hooks import HookRegistry
 import urtext.syntax as syntax
 import urtext.utils as utils
 
@@ -20,21 +24,40 @@ class ProjectList:
                  is_async=True,
                  base_project_path=os.path.join(os.path.dirname(__file__), 'base_project'),
                  urtext_location=None,
+                 cache_location=None,
+                 parse_workers=0,
+                 compile_delay=0.1,
+                 watch_files=False,
+                 watch_interval=1.0,
+                 profile=False,
                  editor_methods=None):
 
         if urtext_location:
             sys.path.append(urtext_location)
 
         self.is_async = is_async
+        self.cache_location = cache_location
+        self.parse_workers = parse_workers
+        self.profile = profile      # time every project's phases; see UrtextProject.profile_report()
         #self.is_async = False  # development
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.executor = PriorityExecutor()
+        self.compile_scheduler = CompileScheduler(self, delay=compile_delay)
+        self.file_watcher = FileWatcher(self, interval=watch_interval) if watch_files else None
         self.editor_methods = editor_methods if editor_methods else {}
         self.entry_point = entry_point.strip()
         self.calls = {}
         self.selectors = {}
         self.project_instance_calls = {}
         self.project_list_instance_calls = {}
+        self.hooks = HookRegistry('calls')
         self.projects = []
+        self.initializing = 0       # project initializations queued or running
+        self.initializing_lock = threading.Lock()
+        self.job_depth = 0          # jobs running, counting those run inside another
+        self.settings_version = 0   # bumped when any project's settings may have changed
+        self.project_paths = {}     # directory -> project that includes it
+        self._project_paths_stale = True
+        self._indexed_paths = {}    # project -> paths project_paths was built from
         self.entry_points = []
         self.current_project = None
         self.node_opened = False
@@ -43,6 +66,9 @@ class ProjectList:
             self.init_project(os.path.abspath(base_project_path), visible=False)
         if os.path.abspath(base_project_path) != os.path.abspath(self.entry_point):
             self.init_project(os.path.abspath(self.entry_point), initial=True, visible=True)
+        if self.file_watcher:
+            # after the projects above have loaded
+            self.execute(self.file_watcher.start, priority=BACKGROUND)
 
     def init_project(self,
         entry_point,
@@ -51,7 +77,16 @@ class ProjectList:
         visible=True,
         make_current=False,
         selector=None):
-        self.execute(self._init_project, entry_point, new_file_node_created=False, initial=initial, make_current=make_current, visible=visible, selector=selector)
+        with self.initializing_lock:
+            self.initializing += 1
+        self.execute(self._init_queued_project, entry_point, new_file_node_created=False, initial=initial, make_current=make_current, visible=visible, selector=selector, priority=BACKGROUND)
+
+    def _init_queued_project(self, *args, **kwargs):
+        try:
+            return self._init_project(*args, **kwargs)
+        finally:
+            with self.initializing_lock:
+                self.initializing -= 1
 
     def _init_project(self,
         entry_point,
@@ -71,17 +106,67 @@ class ProjectList:
                                 new_file_node_created=new_file_node_created)
 
         self.projects.append(project)
+        self.settings_changed()
         self.entry_points.append(project.entry_point)
         if initial or make_current:
             self.current_project = project
         project.initialize(initial=initial, visible=visible, make_current=make_current, selector=selector)
+        self.on_project_paths_synced(project)
         if selector:
             self.run_selector(selector)
 
-    def execute(self, function, *args, **kwargs):
+    def execute(self, function, *args, priority=NORMAL, **kwargs):
+        """
+        priority is INTERACTIVE for user actions, NORMAL for compiles
+        on save and BACKGROUND for project initialization
+        """
+        if self.is_async:
+            return self.executor.submit(self._run_job, function, *args, priority=priority, **kwargs)
+        return self._run_job(function, *args, **kwargs)
+
+    def defer_while_initializing(self, function, *args):
+        """
+        From a job on the executor: if a project is initializing or
+        waiting to, queues function(*args) behind it and returns True.
+        Jobs acting on changed files call this first, since the files
+        may belong to a project not yet compiled.
+        """
+        if not self.is_async:
+            return False
+        with self.initializing_lock:
+            if not self.initializing:
+                return False
+        self.execute(function, *args, priority=BACKGROUND)
+        return True
+
+    def _run_job(self, function, *args, **kwargs):
+        """
+        Snapshots are published when the outermost job ends, not after
+        jobs run in the middle of another, which may be part way
+        through a compile.
+        """
+        self.job_depth += 1
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.job_depth -= 1
+            if not self.job_depth:
+                self._publish_snapshots()
+
+    def _publish_snapshots(self):
+        for project in self.projects:
+            project.publish_snapshot()
+
+    def has_waiting_jobs(self, below=None):
+        return self.is_async and self.executor.has_waiting(below=below)
+
+    def run_waiting_jobs(self, below=None):
+        """
+        called between steps of long jobs to serve more urgent ones;
+        below limits them to jobs more urgent than that priority
+        """
         if self.is_async:
-            return self.executor.submit(function, *args, **kwargs)
-        return function(*args, **kwargs)
+            self.executor.run_waiting(below=below)
     
     def get_setting(self, setting, calling_project):
         for project in [p for p in self.projects if p.entry_point != calling_project.entry_point]:
@@ -91,6 +176,30 @@ class ProjectList:
                     return values
         return []
 
+    def settings_changed(self):
+        self.settings_version += 1
+        self._project_paths_stale = True
+
+    def is_watching_files(self):
+        return self.file_watcher is not None and self.file_watcher.is_running()
+
+    def check_watched_files(self):
+        """ applies changes the file watcher has seen, when not async """
+        if self.file_watcher and not self.is_async:
+            self.file_watcher.check()
+
+    def stop_watching_files(self):
+        if self.file_watcher:
+            self.file_watcher.stop()
+
+    def on_project_paths_synced(self, project=None):
+        if project is None or (
+                project._synced_paths is None
+                or project._synced_paths[1] != self._indexed_paths.get(project)):
+            self._project_paths_stale = True
+        if self.file_watcher:
+            self.file_watcher.set_directories()
+
     def _get_project_from_buffer(self, buffer_id):
         for project in self.projects:
             if buffer_id in project.buffers:
@@ -134,7 +243,9 @@ class ProjectList:
         return self.run_editor_method('popup', message)
 
     def on_modified(self, filename):
-        return self.execute(self._on_modified, filename)
+        if self.is_async:
+            return self.compile_scheduler.schedule(filename)
+        return self._run_job(self._on_modified, filename)
 
     def _on_modified(self, filename):
         project = self._get_project_from_path(
@@ -148,9 +259,34 @@ class ProjectList:
     def _get_project_from_path(self, path):
         if not os.path.isdir(path):
             path = os.path.dirname(path)
-        for project in self.projects:
-            if path in project.get_settings_paths():
-                return project
+        if os.path.isabs(path):
+            path = os.path.normpath(path)
+            project = self._get_project_paths().get(path)
+            if not project and not self._project_paths_stale:
+                # a folder may have been added with no watcher to report it
+                self._project_paths_stale = True
+                project = self._get_project_paths().get(path)
+            return project
+
+    def _get_project_paths(self):
+        """
+        Rebuilds the directory map only after settings have changed or
+        a project's folders were synced to different paths; with more
+        than one project including a directory, the first one added
+        keeps it.
+        """
+        if self._project_paths_stale:
+            self._project_paths_stale = False
+            project_paths = {}
+            indexed_paths = {}
+            for project in self.projects:
+                paths = project._get_settings_paths()
+                indexed_paths[project] = paths
+                for path in paths:
+                    project_paths.setdefault(path, project)
+            self.project_paths = project_paths
+            self._indexed_paths = indexed_paths
+        return self.project_paths
 
     def _get_project_from_title(self, title):
         for project in self.projects:
@@ -216,16 +352,14 @@ class ProjectList:
         return project if project else None
 
     def get_current_project(self, path):
-        for project in self.projects:
-            if path in project.get_settings_paths():
-                return project
-        return None
+        if os.path.isabs(path):
+            return self._get_project_paths().get(os.path.normpath(path))
 
     def visit_file(self, filename):
         self.set_current_project(filename)
         if self.current_project:
             self.notify_node_opened()
-            return self.execute(self.current_project.visit_file, filename)
+            return self.execute(self.current_project.visit_file, filename, priority=BACKGROUND)
 
     def move_file(self,
                   old_filename,
@@ -357,6 +491,7 @@ class ProjectList:
                 instance_call = call(self)
                 instance_call.on_added()
                 self.project_list_instance_calls[call.name[0]] = instance_call
+                self.hooks.set('calls', call.name[0], [instance_call])
                 return
 
         if call.project_instance:
@@ -402,11 +537,11 @@ class ProjectList:
         if self.current_project and selection in self.current_project.selectors:
             if self.current_project.selectors[selection].thread_safe:
                 return self.current_project.selectors[selection].run()
-            return self.execute(self.current_project.selectors[selection].run)
+            return self.execute(self.current_project.selectors[selection].run, priority=INTERACTIVE)
         if selection in self.selectors:
             if self.selectors[selection].thread_safe:
                 return self.selectors[selection].run()
-            self.execute(self.selectors[selection].run)
+            self.execute(self.selectors[selection].run, priority=INTERACTIVE)
 
     @classmethod
     def make_starter_project(self, folder):
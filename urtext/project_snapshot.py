@@ -0,0 +1,305 @@
+import bisect
+
+_removed = object()     # marks an entry removed in a _LayeredDict's changes
+
+class _LayeredDict:
+    """
+    Read-only dict made of a base shared between versions and the
+    entries changed since, so each new version copies only the
+    changes. These are folded into a new base once there are more
+    than the square root of its size.
+    """
+
+    __slots__ = ('base', 'changes', 'size')
+
+    def __init__(self, base=None, changes=None):
+        self.base = base if base is not None else {}
+        self.changes = changes if changes is not None else {}
+        self.size = len(self.base)
+        for key, value in self.changes.items():
+            if key in self.base:
+                self.size -= value is _removed
+            else:
+                self.size += value is not _removed
+
+    def updated(self, changes):
+        """ a new version with changes, {key: value or _removed}, applied """
+        if not changes:
+            return self
+        merged = dict(self.changes)
+        merged.update(changes)
+        if len(merged) <= max(64, int(len(self.base) ** 0.5)):
+            return _LayeredDict(self.base, merged)
+        base = {k: v for k, v in self.base.items() if k not in merged}
+        base.update((k, v) for k, v in merged.items() if v is not _removed)
+        return _LayeredDict(base)
+
+    def get(self, key, default=None):
+        value = self.changes.get(key, _removed)
+        if value is _removed:
+            if key in self.changes:
+                return default
+            value = self.base.get(key, default)
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, _removed)
+        if value is _removed:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _removed) is not _removed
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for key in self.base:
+            if key not in self.changes:
+                yield key
+        for key, value in self.changes.items():
+            if value is not _removed:
+                yield key
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        for key in self:
+            yield self[key]
+
+    def items(self):
+        for key in self:
+            yield key, self[key]
+
+class ProjectSnapshot:
+    """
+    Read-only view of a project's nodes, files and links, with the
+    node browser's order. The project replaces its snapshot as a
+    whole after each change, so code on other threads reading
+    project.snapshot sees one consistent version without locking.
+    Each version shares the maps of the one before it and replaces
+    only the entries that changed.
+
+    The nodes are the project's own, and their fields can change
+    after a version is published. Positions, links and order are
+    copied when the version is made, so read them from the snapshot
+    rather than from the nodes.
+    """
+
+    def __init__(self,
+        version=0,
+        nodes=None,
+        order=None,
+        files=None,
+        positions=None,
+        links_to=None,
+        links_from=None,
+        sort_keys=None,
+        browser_order=(),
+        sort_settings=((), (), None)):
+
+        self.version = version
+        self.nodes = nodes if nodes else _LayeredDict()             # id -> node
+        self.order = order if order else _LayeredDict()             # id -> place in project order
+        self.files = files if files else _LayeredDict()             # filename -> nodes, in project order
+        self.positions = positions if positions else _LayeredDict() # filename -> position index of its nodes
+        self.links_to = links_to if links_to else _LayeredDict()    # id -> ids linking to it, in project order
+        self.links_from = links_from if links_from else _LayeredDict()  # id -> ids it links to
+        self.sort_keys = sort_keys if sort_keys else _LayeredDict() # id -> what the node browser sorts it by
+        self.browser_order = browser_order  # (id, detail) pairs, as project.sort_for_node_browser()
+        self.sort_settings = sort_settings  # (node_browser_sort, use_timestamp, node_browser_detail)
+        self._node_browser_order = None
+
+    def get_node(self, node_id):
+        return self.nodes.get(node_id)
+
+    def get_nodes(self):
+        """ all nodes, in project order """
+        return [node for node_id, node in sorted(
+            self.nodes.items(),
+            key=lambda item: self.order[item[0]])]
+
+    def get_file_nodes(self, filename):
+        """ the file's nodes, by position """
+        index = self.positions.get(filename)
+        if not index:
+            return []
+        nodes = self.files[filename]
+        return [nodes[i] for i in index[4]]
+
+    def get_node_from_position(self, filename, position):
+        index = self.positions.get(filename)
+        if not index:
+            return None
+        starts, ends, max_ends, node_indexes, by_position = index
+        # the first node parsed is the innermost
+        found = None
+        i = bisect.bisect_right(starts, position) - 1
+        while i > -1 and max_ends[i] >= position:
+            if ends[i] >= position and (found is None or node_indexes[i] < found):
+                found = node_indexes[i]
+            i -= 1
+        if found is not None:
+            return self.files[filename][found]
+
+    def get_links_to(self, node_id):
+        return [self.nodes[i] for i in self.links_to.get(node_id, ()) if i in self.nodes]
+
+    def get_links_from(self, node_id):
+        return [self.nodes[i] for i in self.links_from.get(node_id, ()) if i in self.nodes]
+
+    def sort_for_node_browser(self):
+        """ (node, detail) pairs, ordered as project.sort_for_node_browser() """
+        if self._node_browser_order is None:
+            self._node_browser_order = [
+                (self.nodes[node_id], detail) for node_id, detail in self.browser_order]
+        return self._node_browser_order
+
+class SnapshotWriter:
+    """
+    Collects what changed in the project since the last snapshot
+    and publishes a new one, replacing only the changed entries.
+    Runs on the thread that changes the project.
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.node_ids = set()
+        self.filenames = set()
+        self.link_targets = set()
+
+    def node_changed(self, node):
+        self.node_ids.add(node.id)
+        self.filenames.add(node.filename)
+        self.link_targets.update(node.links_ids())
+
+    def node_id_changed(self, old_id):
+        self.node_ids.add(old_id)
+
+    def metadata_changed(self, node_id, keys):
+        self.node_ids.add(node_id)
+
+    def publish(self):
+        project = self.project
+        project.metadata_index._refresh()
+        old = project.snapshot
+        detail_setting = project.get_single_setting('node_browser_detail')
+        sort_settings = (
+            tuple(project.get_setting_as_text('node_browser_sort')),
+            tuple(project.get_setting_as_text('use_timestamp')),
+            detail_setting.text if detail_setting else None)
+        rebuild = not old.version or sort_settings != old.sort_settings
+        if not rebuild and not (self.node_ids or self.filenames or self.link_targets):
+            return old
+
+        if rebuild:
+            old = ProjectSnapshot(version=old.version)
+            self.filenames = set(project.files) | set(project.nodes_by_filename)
+            self.link_targets = set(project.links_to)
+            self.node_ids = set(project.nodes)
+
+        nodes = {}
+        order = {}
+        files = {}
+        positions = {}
+        links_to = {}
+        links_from = {}
+        sort_keys = {}
+        for filename in self.filenames:
+            if filename in project.nodes_by_filename:
+                file_nodes = tuple(project._nodes_from_index(project.nodes_by_filename, filename))
+                files[filename] = file_nodes
+                positions[filename] = _position_index(file_nodes)
+            elif filename in old.files:
+                files[filename] = _removed
+                positions[filename] = _removed
+        for target_id in self.link_targets:
+            if target_id in project.links_to:
+                links_to[target_id] = tuple(sorted(
+                    project.links_to[target_id],
+                    key=lambda node_id: project._node_order[node_id]))
+            elif target_id in old.links_to:
+                links_to[target_id] = _removed
+        keys = set(sort_settings[0])
+        if sort_settings[2]:
+            keys.add(sort_settings[2])
+        # the node browser is sorted again only if a node was added,
+        # removed or moved, or what it sorts on changed
+        resort = rebuild
+        for node_id in self.node_ids:
+            node = project.nodes.get(node_id)
+            if not node:
+                if node_id in old.nodes:
+                    nodes[node_id] = order[node_id] = links_from[node_id] = sort_keys[node_id] = _removed
+                    resort = True
+                continue
+            nodes[node_id] = node
+            order[node_id] = project._node_order[node_id]
+            links_from[node_id] = tuple(node.links_ids())
+            sort_keys[node_id] = _sort_key(node, keys)
+            if not resort and (
+                    old.order.get(node_id) != order[node_id] or
+                    old.sort_keys.get(node_id) != sort_keys[node_id]):
+                resort = True
+
+        browser_order = old.browser_order
+        if resort:
+            browser_order = tuple(
+                (node.id, detail or '') for node, detail in project._sort_nodes_with_details(
+                    list(project.nodes.values()),
+                    list(sort_settings[0]),
+                    reverse=True))
+
+        self.node_ids = set()
+        self.filenames = set()
+        self.link_targets = set()
+        project.snapshot = ProjectSnapshot(
+            version=old.version + 1,
+            nodes=old.nodes.updated(nodes),
+            order=old.order.updated(order),
+            files=old.files.updated(files),
+            positions=old.positions.updated(positions),
+            links_to=old.links_to.updated(links_to),
+            links_from=old.links_from.updated(links_from),
+            sort_keys=old.sort_keys.updated(sort_keys),
+            browser_order=browser_order,
+            sort_settings=sort_settings)
+        return project.snapshot
+
+def _sort_key(node, keys):
+    """ the first values of the node browser's keys, as they sort and display """
+    sort_key = []
+    for k in sorted(keys):
+        value = node.metadata.get_first_value(k)
+        if value is not None:
+            sort_key.append((
+                k,
+                value.text,
+                value.timestamp.datetime if value.timestamp else None,
+                value.timestamp.wrapped_string if value.timestamp else None))
+    return tuple(sort_key)
+
+def _position_index(nodes):
+    """
+    The nodes' ranges sorted by start, with the running maximum end,
+    as in UrtextBuffer's position index, and the nodes' indexes in
+    order of their start positions
+    """
+    flattened = sorted(
+        (r[0], r[1], node_index)
+        for node_index, node in enumerate(nodes)
+        for r in node.ranges)
+    max_ends = []
+    max_end = -1
+    for r in flattened:
+        max_end = max(max_end, r[1])
+        max_ends.append(max_end)
+    by_position = sorted(range(len(nodes)), key=lambda i: nodes[i].start_position)
+    return (
+        [r[0] for r in flattened],
+        [r[1] for r in flattened],
+        max_ends,
+        [r[2] for r in flattened],
+        by_position)
@@ -0,0 +1,110 @@
+class SearchIndex:
+    """
+    Trigram index over the lowercased contents of nodes. Built on
+    the first search; after that, nodes whose contents changed are
+    re-indexed the next time the index is read.
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.trigrams = {}      # trigram -> set of node ids
+        self.contents = {}      # node id -> lowercased contents
+        self.indexed = {}       # node -> node id
+        self.changed = set()
+        self.built = False
+
+    def mark(self, node):
+        if self.built:
+            self.changed.add(node)
+
+    def find(self, substring):
+        """ ids of nodes whose contents contain substring, case-insensitive """
+        substring = substring.lower()
+        return [node_id for node_id in self._candidates(substring)
+            if substring in self.contents[node_id]]
+
+    def search(self, query):
+        """
+        Returns (node id, score) for nodes containing every
+        whitespace-separated term of query, best first.
+        """
+        terms = query.lower().split()
+        if not terms:
+            return []
+        candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            term_candidates = self._candidates(term)
+            if candidates is None:
+                candidates = set(term_candidates)
+            else:
+                candidates.intersection_update(term_candidates)
+            if not candidates:
+                return []
+        results = []
+        for node_id in candidates:
+            contents = self.contents[node_id]
+            if not all(term in contents for term in terms):
+                continue
+            title = self.project.nodes[node_id].title.lower()
+            results.append((
+                node_id,
+                (len([term for term in terms if term in title]),
+                sum(contents.count(term) for term in terms))))
+        results.sort(key=lambda r: (
+            -r[1][0],
+            -r[1][1],
+            self.project._node_order.get(r[0], 0)))
+        return results
+
+    def _candidates(self, substring):
+        self._refresh()
+        if len(substring) < 3:
+            return self.contents
+        node_sets = []
+        for trigram in _trigrams(substring):
+            if trigram not in self.trigrams:
+                return []
+            node_sets.append(self.trigrams[trigram])
+        node_sets.sort(key=len)
+        return set.intersection(*node_sets)
+
+    def _refresh(self):
+        if not self.built:
+            for node in self.project.nodes.values():
+                self._add(node)
+            self.built = True
+            return
+        changed = list(self.changed)
+        self.changed.clear()
+        for node in changed:
+            if node in self.indexed:
+                self._remove(node)
+        for node in changed:
+            if self.project.nodes.get(node.id) is node:
+                self._add(node)
+
+    def _add(self, node):
+        contents = node.stripped_contents.lower()
+        self.contents[node.id] = contents
+        for trigram in _trigrams(contents):
+            self.trigrams.setdefault(trigram, set()).add(node.id)
+        self.indexed[node] = node.id
+
+    def _remove(self, node):
+        node_id = self.indexed.pop(node)
+        for trigram in _trigrams(self.contents.pop(node_id)):
+            self.trigrams[trigram].discard(node_id)
+            if not self.trigrams[trigram]:
+                del self.trigrams[trigram]
+
+    def is_consistent(self):
+        """ compares the index against one built from scratch """
+        self._refresh()
+        rebuilt = SearchIndex(self.project)
+        rebuilt._refresh()
+        return (
+            rebuilt.contents == self.contents and
+            rebuilt.trigrams == self.trigrams)
+
+def _trigrams(contents):
+    return set(contents[i:i + 3] for i in range(len(contents) - 2))
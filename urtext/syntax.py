@@ -341,6 +341,21 @@ compiled_symbols = {
     compact_node_c : 'compact_node',
     meta_to_node_c : 'meta_to_node'
     }
+# all symbols in one pattern. Each alternative consumes at most
+# its first character, so symbols inside other symbols
+# (e.g. braces in pointers) are still found.
+compiled_symbols_combined_c = re.compile(
+    '|'.join([
+        '(?P<opening_wrapper>' + opening_wrapper + ')',
+        '(?P<closing_wrapper>' + closing_wrapper + ')',
+        '(?P<pointer>(?=' + node_pointer + ')' + link_opening_pipe_escaped + ')',
+        '(?P<compact_node>(?=' + compact_node + '))',
+        r'(?P<meta_to_node>(?<!\w)(?=' + meta_to_node + r')\w)',
+        ]),
+    flags=re.MULTILINE)
+compiled_symbols_by_type = {
+    symbol_type : symbol for symbol, symbol_type in compiled_symbols.items()
+    }
 embedded_syntax_symbols = {
     re.compile(embedded_syntax_open) : 'embedded_syntax_open', 
     re.compile(embedded_syntax_close) : 'embedded_syntax_close',
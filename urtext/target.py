@@ -1,5 +1,20 @@
 class UrtextTarget:
 
+	__slots__ = (
+		'matching_string',
+		'is_virtual',
+		'is_link',
+		'is_node',
+		'is_file',
+		'node_id',
+		'link',
+		'is_raw_string',
+		'project_name',
+		'filename',
+		'path',
+		'is_missing',
+		)
+
 	def __init__(self, string):
 		self.matching_string = string
 		self.is_virtual = False
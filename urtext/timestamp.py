@@ -5,6 +5,15 @@ import urtext.syntax as syntax
 default_date = datetime.datetime(1970,1,1, tzinfo=datetime.timezone.utc)
 
 class UrtextTimestamp:
+
+    __slots__ = (
+        'wrapped_string',
+        'unwrapped_string',
+        'datetime',
+        'start_position',
+        'end_position',
+        )
+
     def __init__(self, 
         unwrapped_string, 
         start_position=None):
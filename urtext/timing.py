@@ -0,0 +1,168 @@
+import functools
+import time
+
+class Timer:
+    """
+    Adds up the time spent in named phases of loading and compiling,
+    per phase and per file or frame. Spans nest; each phase also
+    gets the time not spent in the spans nested in it. A disabled
+    timer hands out one shared span that does nothing, so timing
+    costs next to nothing when it is off.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stack = []     # open spans, innermost last
+        self.reset()
+
+    def reset(self):
+        """ clears the totals; spans still open are added to the new ones """
+        self.phases = {}    # phase -> [count, seconds, seconds outside nested spans]
+        self.files = {}     # filename -> {phase: [count, seconds, seconds outside nested spans]}
+        self.frames = {}    # frame -> {phase: [count, seconds, seconds outside nested spans]}
+        self.started = time.time()
+
+    def span(self, phase, filename=None, frame=None):
+        if not self.enabled:
+            return _null_span
+        return _Span(self, phase, filename, frame)
+
+    def report(self):
+        """ totals as plain data, each group slowest first """
+        return {
+            'enabled': self.enabled,
+            'since': self.started,
+            'phases': {phase: {
+                    'count': count,
+                    'seconds': seconds,
+                    'self_seconds': self_seconds,
+                } for phase, (count, seconds, self_seconds) in _slowest(self.phases)},
+            'files': _report_items(self.files),
+            'frames': _report_items(self.frames),
+        }
+
+    def _record(self, span, seconds):
+        self.stack.pop()
+        if self.stack:
+            self.stack[-1].nested += seconds
+        entries = [self.phases.setdefault(span.phase, [0, 0, 0])]
+        if span.filename:
+            entries.append(self.files.setdefault(span.filename, {}).setdefault(span.phase, [0, 0, 0]))
+        if span.frame:
+            entries.append(self.frames.setdefault(span.frame, {}).setdefault(span.phase, [0, 0, 0]))
+        for entry in entries:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += seconds - span.nested
+
+class _Span:
+
+    __slots__ = ('timer', 'phase', 'filename', 'frame', 'start', 'nested')
+
+    def __init__(self, timer, phase, filename, frame):
+        self.timer = timer
+        self.phase = phase
+        self.filename = filename
+        self.frame = frame
+        self.nested = 0
+
+    def __enter__(self):
+        self.timer.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer._record(self, time.perf_counter() - self.start)
+        return False
+
+class _NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_null_span = _NullSpan()
+
+def timed(phase, filename=None, frame=None):
+    """
+    Times a method of an object with a `timer` as one span of phase.
+    filename and frame, if given, take the method's arguments and
+    return what to add the time to.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def timed_method(self, *args, **kwargs):
+            if not self.timer.enabled:
+                return method(self, *args, **kwargs)
+            with self.timer.span(
+                    phase,
+                    filename=filename(*args, **kwargs) if filename else None,
+                    frame=frame(*args, **kwargs) if frame else None):
+                return method(self, *args, **kwargs)
+        return timed_method
+    return decorate
+
+def _slowest(entries):
+    return sorted(entries.items(), key=lambda item: item[1][1], reverse=True)
+
+def _report_items(items):
+    """ files or frames by time, which is the sum of their phases' own times """
+    report = {}
+    for key, phases in sorted(
+            items.items(),
+            key=lambda item: sum(p[2] for p in item[1].values()),
+            reverse=True):
+        report[key] = {
+            'seconds': sum(p[2] for p in phases.values()),
+            'phases': {phase: {
+                    'count': count,
+                    'seconds': seconds,
+                    'self_seconds': self_seconds,
+                } for phase, (count, seconds, self_seconds) in _slowest(phases)},
+        }
+    return report
+
+class FrameStats:
+    """
+    For each frame, by frame_key: how many times it ran and why, the
+    time it took in total and in each of its calls, and the nodes it
+    included and characters it output on its last run.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = {}
+
+    def record(self, key, reason, seconds, operation_times, nodes, characters):
+        entry = self.frames.get(key)
+        if entry is None:
+            entry = self.frames[key] = {
+                'runs': {},
+                'count': 0,
+                'seconds': 0,
+                'max_seconds': 0,
+                'operations': {},
+                'nodes': 0,
+                'characters': 0,
+            }
+        entry['runs'][reason] = entry['runs'].get(reason, 0) + 1
+        entry['count'] += 1
+        entry['seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+        for name, operation_seconds in operation_times:
+            entry['operations'][name] = entry['operations'].get(name, 0) + operation_seconds
+        entry['nodes'] = nodes
+        entry['characters'] = characters
+
+    def slowest(self, limit=None):
+        """ (frame key, entry) by total time, slowest first """
+        frames = sorted(self.frames.items(), key=lambda item: item[1]['seconds'], reverse=True)
+        return frames[:limit] if limit else frames
+
+    def report(self, limit=None):
+        return [dict(entry, node_id=key[0], definition=key[1].strip())
+            for key, entry in self.slowest(limit)]
@@ -3,6 +3,7 @@ from urtext.link import UrtextLink
 from urtext.url import url_match_c
 import urtext.syntax as syntax
 import os
+import sys
 
 def strip_backtick_escape(contents):
     ranges = []
@@ -124,7 +125,7 @@ def get_all_links_from_string(string, node, project_list, include_http=False):
     for match in syntax.cross_project_link_with_node_c.finditer(replaced_contents):
         link = UrtextLink(match.group(), node, project_list)
         link.project_name = match.group(2)
-        link.node_id = match.group(7)
+        link.node_id = sys.intern(match.group(7))
         link.is_node = True
         if match.group(9):
             try:
@@ -170,7 +171,7 @@ def get_all_links_from_string(string, node, project_list, include_http=False):
             link.bound = True
             link.bound_argument = match.group(5).strip()
 
-        link.node_id = match.group(5).strip()
+        link.node_id = sys.intern(match.group(5).strip())
         link.is_node = True
         if match.group(8):
             try: